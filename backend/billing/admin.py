@@ -20,4 +20,13 @@ class ClassAdmin(NestedModelAdmin):
     search_fields = ("name",)
     inlines = [ClassOptionInLine]
     
-    
\ No newline at end of file
+@admin.register(ClassOption)
+class ClassOptionAdmin(admin.ModelAdmin):
+    # needed by the enrollment autocomplete widget
+    list_display = ("klass", "identifier", "weekly_sessions")
+    list_select_related = ("klass",)
+    search_fields = ("klass__name", "identifier")
+    ordering = ("klass__name", "weekly_sessions")
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("klass")
@@ -0,0 +1,237 @@
+# billing/reminders.py
+"""
+Payment reminders for late students.
+
+The late list comes out of student_finance() in one query.  Messages go
+out concurrently on an asyncio loop, capped by a semaphore (concurrency) and
+a token bucket (rate).  A ReminderLog row per student and period keeps anyone
+from getting the same reminder twice: it is claimed before the message goes
+out (so overlapping or crashed runs never send again) and released if the
+send fails.  The stub transport records nothing.
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import ReminderLog
+from core.querysets import student_finance
+
+logger = logging.getLogger(__name__)
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+MONTHS = (
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+    "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+)
+
+
+@dataclass
+class Reminder:
+    student_id: int
+    to: str
+    subject: str
+    body: str
+
+
+@dataclass
+class DispatchMetrics:
+    late: int = 0
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0          # no usable contact for the transport
+    already_sent: int = 0     # reminded earlier this period
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def per_second(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+# ─── TRANSPORTS ───────────────────────────────────────────────────────────────
+
+class StubTransport:
+    """
+    Local transport for testing: keeps messages in `outbox` instead of sending
+    them, and leaves no ReminderLog behind, so a real run still reaches everyone.
+    """
+    name = "stub"
+    records = False
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.outbox: list[Reminder] = []
+
+    def accepts(self, contact: str) -> bool:
+        return bool(contact.strip())
+
+    async def send(self, reminder: Reminder):
+        await asyncio.sleep(self.latency)
+        self.outbox.append(reminder)
+        logger.info("stub reminder to %s: %s", reminder.to, reminder.subject)
+
+
+class SMTPTransport:
+    """Sends through Django's configured EMAIL_BACKEND (SMTP by default)."""
+    name = "smtp"
+    records = True
+
+    def accepts(self, contact: str) -> bool:
+        return bool(EMAIL_RE.match(contact.strip()))
+
+    async def send(self, reminder: Reminder):
+        message = EmailMessage(reminder.subject, reminder.body, to=[reminder.to])
+        # the SMTP client blocks; each send gets its own worker thread
+        await asyncio.to_thread(message.send, fail_silently=False)
+
+
+def get_transport(path: str | None = None):
+    return import_string(path or settings.REMINDER_TRANSPORT)()
+
+
+# ─── MESSAGES ─────────────────────────────────────────────────────────────────
+
+def render_reminder(row: dict, period: date) -> Reminder:
+    month = f"{MONTHS[period.month - 1]} {period.year}"
+    debt  = f"{row['debt']:,}".replace(",", ".")
+    return Reminder(
+        student_id=row["id"],
+        to=row["contact"].strip(),
+        subject=f"Recordatorio de pago - cuota de {month}",
+        body=(
+            f"Hola {row['first_name']} {row['last_name']}:\n\n"
+            f"Te recordamos que la cuota de {month} tiene un saldo pendiente de $ {debt}.\n"
+            "Si ya realizaste el pago, por favor desestimá este mensaje.\n\n"
+            "Muchas gracias."
+        ),
+    )
+
+
+def late_reminders(transport, today: date, metrics: DispatchMetrics) -> list[Reminder]:
+    period = today.strftime("%Y-%m")
+    reminded = set(
+        ReminderLog.objects.filter(period=period).values_list("student_id", flat=True)
+    )
+
+    rows = list(
+        student_finance(today)
+        .filter(active=True, is_late=True)
+        .values("id", "first_name", "last_name", "contact", "debt")
+    )
+    reminders = []
+    for row in rows:
+        if row["id"] in reminded:
+            metrics.already_sent += 1
+        elif not transport.accepts(row["contact"]):
+            metrics.skipped += 1
+        else:
+            reminders.append(render_reminder(row, today))
+
+    metrics.late = len(rows)
+    return reminders
+
+
+# ─── DISPATCH ─────────────────────────────────────────────────────────────────
+
+class RateLimiter:
+    """Token bucket: at most `rate` sends per second, bursts up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def dispatch(reminders, transport, *, concurrency: int, rate: float, metrics: DispatchMetrics):
+    """Send every reminder; returns the ones delivered."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter   = RateLimiter(rate) if rate else None
+    delivered = []
+
+    async def send_one(reminder):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                await transport.send(reminder)
+            except Exception as exc:
+                metrics.failed += 1
+                metrics.errors.append((reminder.student_id, repr(exc)))
+                logger.warning("reminder to student %s failed: %r", reminder.student_id, exc)
+            else:
+                metrics.sent += 1
+                delivered.append(reminder)
+
+    await asyncio.gather(*(send_one(reminder) for reminder in reminders))
+    return delivered
+
+
+def claim(reminders, period: str, channel: str, metrics: DispatchMetrics) -> list[Reminder]:
+    """
+    Insert the ReminderLog rows up front and keep only the reminders whose row
+    this run inserted; a concurrent run that got there first owns the rest.
+    """
+    claimed_at = timezone.now()
+    ReminderLog.objects.bulk_create(
+        [
+            ReminderLog(student_id=r.student_id, period=period, channel=channel, sent_at=claimed_at)
+            for r in reminders
+        ],
+        ignore_conflicts=True,
+    )
+    ours = set(
+        ReminderLog.objects
+        .filter(period=period, sent_at=claimed_at, student_id__in=[r.student_id for r in reminders])
+        .values_list("student_id", flat=True)
+    )
+    metrics.already_sent += len(reminders) - len(ours)
+    return [r for r in reminders if r.student_id in ours]
+
+
+def send_late_reminders(today: date | None = None, *, transport=None, concurrency: int | None = None,
+                        rate: float | None = None, dry_run: bool = False) -> DispatchMetrics:
+    today       = today or date.today()
+    period      = today.strftime("%Y-%m")
+    transport   = transport or get_transport()
+    concurrency = concurrency or settings.REMINDER_CONCURRENCY
+    rate        = settings.REMINDER_RATE if rate is None else rate
+    metrics     = DispatchMetrics()
+
+    reminders = late_reminders(transport, today, metrics)
+    if dry_run or not reminders:
+        return metrics
+    if transport.records:
+        reminders = claim(reminders, period, transport.name, metrics)
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(dispatch(reminders, transport, concurrency=concurrency, rate=rate, metrics=metrics))
+    finally:
+        metrics.elapsed = time.perf_counter() - start
+        if transport.records and metrics.errors:
+            # release failed claims so the next run retries them
+            ReminderLog.objects.filter(
+                period=period, student_id__in=[student_id for student_id, _ in metrics.errors],
+            ).delete()
+    return metrics
@@ -1,3 +1,94 @@
+from datetime import date
+
 from django.test import TestCase
 
-# Create your tests here.
+from core.models import Class, ClassOption, Enrollment, Payment, PricePlan, ReminderLog, Student
+from core.tests import seed
+
+from .reminders import DispatchMetrics, StubTransport, claim, late_reminders, send_late_reminders
+
+
+class RecordingTransport(StubTransport):
+    """Stub that keeps ReminderLog rows like a real transport, failing for `fail_for`."""
+    name = "test"
+    records = True
+
+    def __init__(self, fail_for=()):
+        super().__init__(latency=0)
+        self.fail_for = set(fail_for)
+
+    async def send(self, reminder):
+        if reminder.student_id in self.fail_for:
+            raise ConnectionError("mailbox unavailable")
+        await super().send(reminder)
+
+
+class ReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(6)
+        Student.objects.update(contact="familia@example.com")
+        cls.today = date.today().replace(day=20)
+        cls.late = {
+            r.student_id
+            for r in late_reminders(StubTransport(), cls.today, DispatchMetrics())
+        }
+
+    def test_stub_transport_leaves_no_log(self):
+        transport = StubTransport(latency=0)
+        metrics = send_late_reminders(self.today, transport=transport)
+
+        self.assertEqual(metrics.sent, len(self.late))
+        self.assertEqual({r.student_id for r in transport.outbox}, self.late)
+        self.assertFalse(ReminderLog.objects.exists())
+
+    def test_second_run_sends_nothing(self):
+        send_late_reminders(self.today, transport=RecordingTransport())
+        transport = RecordingTransport()
+        metrics = send_late_reminders(self.today, transport=transport)
+
+        self.assertEqual(transport.outbox, [])
+        self.assertEqual(metrics.already_sent, len(self.late))
+
+    def test_failed_send_releases_its_claim(self):
+        failing = min(self.late)
+        metrics = send_late_reminders(self.today, transport=RecordingTransport(fail_for=[failing]))
+
+        self.assertEqual(metrics.failed, 1)
+        logged = set(ReminderLog.objects.values_list("student_id", flat=True))
+        self.assertEqual(logged, self.late - {failing})
+
+    def test_claim_skips_rows_another_run_holds(self):
+        period = self.today.strftime("%Y-%m")
+        reminders = late_reminders(StubTransport(), self.today, DispatchMetrics())
+        # an overlapping run claims one student between our read and our claim
+        taken = min(self.late)
+        ReminderLog.objects.create(student_id=taken, period=period, channel="test")
+
+        metrics = DispatchMetrics()
+        ours = claim(reminders, period, "test", metrics)
+
+        self.assertEqual({r.student_id for r in ours}, self.late - {taken})
+        self.assertEqual(metrics.already_sent, 1)
+
+    def test_student_enrolled_on_both_sides_of_the_cutoff_gets_one_full_reminder(self):
+        judo = ClassOption.objects.get()
+        karate = ClassOption.objects.create(
+            klass=Class.objects.create(name="Karate"), weekly_sessions=3, identifier="K3",
+        )
+        PricePlan.objects.create(option=karate, cycle="M", base_price=7000)
+        student = Student.objects.create(
+            DNI="41000000", first_name="Tres", last_name="Clases", birth_date=date(2014, 1, 1),
+            cuil="20410000003", contact="tres@example.com",
+        )
+        for option, day in ((judo, 1), (judo, 2), (karate, 15)):
+            Enrollment.objects.create(student=student, option=option, start=self.today.replace(day=day))
+        owed = sum(Payment.objects.filter(enrollment__student=student).values_list("amount_due", flat=True))
+
+        reminders = [
+            r for r in late_reminders(StubTransport(), self.today, DispatchMetrics())
+            if r.student_id == student.pk
+        ]
+
+        self.assertEqual(len(reminders), 1)
+        self.assertIn(f"saldo pendiente de $ {owed:,}".replace(",", "."), reminders[0].body)
@@ -3,6 +3,11 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Besides the regular API it serves the long-lived Server-Sent Events stream
+(/api/events/, see core.events) and the async read endpoints (/api/async/,
+see core.async_views), which need an ASGI server such as
+``gunicorn -k uvicorn.workers.UvicornWorker``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -47,8 +47,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replica.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -82,9 +84,39 @@ DATABASES = {
         'PASSWORD': config('POSTGRES_PASSWORD'),
         'HOST': config('POSTGRES_HOST'),
         'PORT': config('POSTGRES_PORT', default='5432'),
+        # keep connections open across requests instead of reconnecting each time
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        # pgbouncer in transaction mode can't hold server-side cursors (.iterator())
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_PGBOUNCER', default=False, cast=bool),
     }
 }
 
+# psycopg 3 connection pool (psycopg[pool], see requirements.txt); replaces CONN_MAX_AGE
+if config('DB_POOL', default=False, cast=bool):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        },
+    }
+
+# Optional read replica for read-only viewsets (see core/replica.py)
+if config('POSTGRES_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': config('POSTGRES_REPLICA_HOST'),
+        'PORT': config('POSTGRES_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.replica.ReplicaRouter']
+
+# seconds of replication lag tolerated before reads fall back to the primary
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=2, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +156,35 @@ STATIC_URL = 'static/'
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Payment receipts: rendered PDFs are cached here by content hash
+RECEIPT_CACHE_DIR = config('RECEIPT_CACHE_DIR', default=str(BASE_DIR / "receipts"))
+# process pool size for large batches (see billing/receipts.py); 0 = one per
+# CPU core, 1 = always render inline
+RECEIPT_WORKERS = config('RECEIPT_WORKERS', default=0, cast=int)
+
+# Email (payment reminders)
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+
+# Payment reminders: transport class, max sends in flight, max sends per second (0 = no limit)
+# (billing.reminders.StubTransport for local runs: sends and records nothing)
+REMINDER_TRANSPORT = config('REMINDER_TRANSPORT', default='billing.reminders.SMTPTransport')
+REMINDER_CONCURRENCY = config('REMINDER_CONCURRENCY', default=10, cast=int)
+REMINDER_RATE = config('REMINDER_RATE', default=5, cast=float)
+
+# Grant the family discount to every student whose household (same CUIL) has
+# two or more members; off = only students flagged is_family_member get it
+HOUSEHOLD_FAMILY_DISCOUNT = config('HOUSEHOLD_FAMILY_DISCOUNT', default=False, cast=bool)
+
+# Staff-only request profiling with ?profile=1 (see core/profiling.py)
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
+PROFILING_INTERVAL = config('PROFILING_INTERVAL', default=0.001, cast=float)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / "profiles"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
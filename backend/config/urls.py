@@ -1,6 +1,8 @@
 from django.contrib import admin
-from django.urls import include, path
-from core.views import StudentViewSet, ClassViewSet, ClassOptionViewSet, EnrollmentViewSet, PaymentViewSet, PaymentListViewSet
+from django.urls import include, path, re_path
+from core.views import StudentViewSet, ClassViewSet, ClassOptionViewSet, EnrollmentViewSet, PaymentViewSet, PaymentListViewSet, HouseholdViewSet, SyncViewSet, student_events, health, summary
+from core import async_views
+from core.profiling import profile_report
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 
@@ -11,10 +13,21 @@ router.register(r"class-options", ClassOptionViewSet, basename="class-options")
 router.register(r"enrollments", EnrollmentViewSet, basename="enrollments")
 router.register(r"payments", PaymentViewSet, basename="payments")
 router.register(r"payments-simple", PaymentListViewSet, basename="payments-simple",)
+router.register(r"households", HouseholdViewSet, basename="households")
+router.register(r"sync", SyncViewSet, basename="sync")
 
 urlpatterns = [
     path('nested_admin/', include("nested_admin.urls")),
     path('admin/', admin.site.urls),
+    path('api/health/', health, name='health'),
+    path('api/events/', student_events, name='student-events'),
+    path('api/summary/', summary, name='summary'),
+    path('api/async/students/', async_views.students, name='async-students'),
+    path('api/async/payments/', async_views.payments, name='async-payments'),
+    path('api/async/payments-simple/', async_views.payments_simple, name='async-payments-simple'),
+    path('api/async/class-options/', async_views.class_options, name='async-class-options'),
+    path('api/async/summary/', async_views.summary, name='async-summary'),
+    re_path(r'^api/profiles/(?P<profile_id>[\w-]+)\.(?P<fmt>txt|folded)$', profile_report, name='profile-report'),
     path('api/', include(router.urls)),
     path('api/auth/', obtain_auth_token),
 ]
@@ -1,3 +1,104 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
 
-# Register your models here.
+from .events import notify_students
+from .households import refresh_households
+from .models import Enrollment, Household, Payment, Student
+from .services import payments_crossing_cutoff, reprice_late_payments
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Unfiltered changelists on big tables use Postgres' row estimate
+    (pg_class.reltuples) instead of a full COUNT(*).
+    """
+    ESTIMATE_ABOVE = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = getattr(self.object_list, "query", None)
+        if queryset is not None and not queryset.where:
+            with connections[self.object_list.db].cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [self.object_list.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.ESTIMATE_ABOVE:
+                return row[0]
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False      # skips the second, unfiltered COUNT(*)
+    list_per_page = 50
+
+
+@admin.register(Student)
+class StudentAdmin(LargeTableAdmin):
+    list_display = ("DNI", "last_name", "first_name", "cuil", "active", "is_family_member", "credit_balance")
+    list_filter = ("active", "is_family_member")
+    search_fields = ("DNI", "last_name", "first_name", "cuil")
+    ordering = ("last_name", "first_name")
+    # credit changes must go through the ledger (Student.set_credit_balance)
+    readonly_fields = ("credit_balance", "household", "created_at", "updated_at")
+
+
+@admin.register(Household)
+class HouseholdAdmin(LargeTableAdmin):
+    list_display = ("cuil", "size", "debt", "credit", "rolled_up_on")
+    search_fields = ("cuil", "members__DNI")
+    ordering = ("cuil",)
+    readonly_fields = ("size", "debt", "credit", "rolled_up_on", "updated_at")
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(LargeTableAdmin):
+    list_display = ("student", "option", "start")
+    list_select_related = ("student", "option__klass")
+    search_fields = ("student__DNI", "student__last_name", "student__first_name", "option__klass__name")
+    autocomplete_fields = ("student", "option")
+    ordering = ("-start", "-id")
+
+    def get_queryset(self, request):
+        # also used by the autocomplete endpoint, where __str__ needs the relations
+        return super().get_queryset(request).select_related("student", "option__klass")
+
+
+@admin.register(Payment)
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ("id", "enrollment", "cycle", "due_date", "paid_on", "amount_due", "amount_paid", "method")
+    list_select_related = ("enrollment__student", "enrollment__option__klass")
+    list_filter = ("method", "cycle", "paid_on")
+    search_fields = ("enrollment__student__DNI", "enrollment__student__last_name")
+    date_hierarchy = "due_date"
+    autocomplete_fields = ("enrollment",)
+    ordering = ("-due_date", "-id")
+    readonly_fields = ("amount_due", "priced_on", "updated_at")
+    actions = ("mark_paid", "reprice")
+
+    @admin.action(description="Marcar como pagados (importe exacto)")
+    def mark_paid(self, request, queryset):
+        unpaid = queryset.filter(Q(amount_paid__isnull=True) | Q(amount_paid__lt=F("amount_due")))
+        students = list(unpaid.values_list("enrollment__student_id", "enrollment__student__household_id"))
+        # paying exactly amount_due leaves credit untouched, as in Payment.save
+        updated = unpaid.update(
+            amount_paid=F("amount_due"),
+            paid_on=timezone.localdate(),
+            updated_at=timezone.now(),
+        )
+        refresh_households(household for _, household in students)
+        notify_students(student for student, _ in students)
+        self.message_user(request, f"{updated} pago(s) marcados como pagados.", messages.SUCCESS)
+
+    @admin.action(description="Aplicar recargo por mora")
+    def reprice(self, request, queryset):
+        changes = reprice_late_payments(
+            queryset=payments_crossing_cutoff().filter(pk__in=queryset.values("pk"))
+        )
+        self.message_user(request, f"{len(changes)} pago(s) recalculados.", messages.SUCCESS)
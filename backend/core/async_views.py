@@ -0,0 +1,67 @@
+# core/async_views.py
+"""
+Async read-only endpoints for dashboards, served by the ASGI app (config.asgi).
+
+  GET /api/async/students/         same rows as /api/students/
+  GET /api/async/payments/         same rows as /api/payments/
+  GET /api/async/payments-simple/  same rows as /api/payments-simple/
+  GET /api/async/class-options/    same rows as /api/class-options/
+  GET /api/async/summary/          same totals as /api/summary/
+
+The lists reuse the fast list path of the sync viewsets (core.fastlist) but
+read through the async ORM, so a slow query parks a coroutine instead of
+holding a worker.  The viewsets' filter fields apply as on the sync API;
+search, `?ordering=` and write methods stay there.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_safe
+from django_filters.rest_framework import DjangoFilterBackend
+
+from .fastlist import afast_rows, dumps
+from .querysets import finance_summary
+from .replica import read_from_replica
+from .views import ClassOptionViewSet, PaymentListViewSet, PaymentViewSet, StudentViewSet
+
+
+def _json(data) -> HttpResponse:
+    return HttpResponse(dumps(data), content_type="application/json")
+
+
+def _list_view(viewset_class):
+    """Async GET view listing the fast rows of *viewset_class*."""
+
+    @require_safe
+    async def view(request):
+        viewset  = viewset_class()
+        queryset = viewset.get_queryset()
+
+        # filterset_class or filterset_fields, resolved like the sync endpoint
+        filterset_class = DjangoFilterBackend().get_filterset_class(viewset, queryset)
+        if filterset_class is not None:
+            filterset = filterset_class(request.GET, queryset=queryset)
+            # model choice filters look their value up in the database
+            if not await sync_to_async(filterset.is_valid)():
+                return JsonResponse(filterset.errors, status=400)
+            queryset = filterset.qs
+        if getattr(viewset, "ordering", None):
+            queryset = queryset.order_by(*viewset.ordering)
+
+        read_from_replica()
+        return _json(await afast_rows(queryset, viewset.get_fast_list_fields()))
+
+    view.__name__ = f"async_{viewset_class.__name__}"
+    return view
+
+
+students        = _list_view(StudentViewSet)
+payments        = _list_view(PaymentViewSet)
+payments_simple = _list_view(PaymentListViewSet)
+class_options   = _list_view(ClassOptionViewSet)
+
+
+@require_safe
+async def summary(request):
+    read_from_replica()
+    queryset, aggregates = finance_summary()
+    return _json(await queryset.aaggregate(**aggregates))
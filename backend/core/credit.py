@@ -0,0 +1,78 @@
+# core/credit.py
+from datetime import datetime
+
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CreditMovement, CreditSnapshot, Student
+
+
+def balance_at(student_id: int, when: datetime | None = None) -> int:
+    """
+    Credit balance of a student at *when*: the latest snapshot taken by then
+    plus the movements recorded after it.
+    """
+    when = when or timezone.now()
+    snapshot = (
+        CreditSnapshot.objects
+        .filter(student_id=student_id, taken_at__lte=when)
+        .order_by("-taken_at")
+        .first()
+    )
+    tail = CreditMovement.objects.filter(student_id=student_id, created_at__lte=when)
+    balance = 0
+    if snapshot is not None:
+        tail = tail.filter(pk__gt=snapshot.last_movement_id)
+        balance = snapshot.balance
+    return balance + tail.aggregate(total=Coalesce(Sum("amount"), 0))["total"]
+
+
+def take_snapshots(at: datetime | None = None) -> int:
+    """
+    Snapshot every student whose ledger moved since their last snapshot.
+    Each new balance is the previous snapshot plus the movements after its
+    last_movement_id, so a run reads only the tail of the ledger.
+    """
+    at = at or timezone.now()
+    previous = (
+        CreditSnapshot.objects
+        .filter(student=OuterRef("pk"), taken_at__lte=at)
+        .order_by("-taken_at", "-pk")
+    )
+    tail = (
+        CreditMovement.objects
+        .filter(student=OuterRef("pk"), created_at__lte=at, pk__gt=OuterRef("since"))
+        .order_by()
+        .values("student")
+    )
+    rows = (
+        Student.objects
+        .annotate(
+            since=Coalesce(Subquery(previous.values("last_movement_id")[:1]), 0),
+            base=Coalesce(Subquery(previous.values("balance")[:1]), 0),
+            delta=Subquery(tail.annotate(total=Sum("amount")).values("total")),
+            last_id=Subquery(tail.annotate(last=Max("pk")).values("last")),
+        )
+        .filter(last_id__isnull=False)
+        .values("pk", "base", "delta", "last_id")
+    )
+    snapshots = [
+        CreditSnapshot(
+            student_id=row["pk"], taken_at=at,
+            balance=row["base"] + row["delta"], last_movement_id=row["last_id"],
+        )
+        for row in rows
+    ]
+    CreditSnapshot.objects.bulk_create(snapshots, batch_size=500)
+    return len(snapshots)
+
+
+def credit_cache_mismatches():
+    """Students whose credit_balance column disagrees with their ledger."""
+    return (
+        Student.objects
+        .annotate(ledger=Coalesce(Sum("credit_movements__amount"), 0))
+        .exclude(credit_balance=F("ledger"))
+        .values("id", "DNI", "credit_balance", "ledger")
+    )
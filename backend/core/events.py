@@ -0,0 +1,153 @@
+# core/events.py
+"""
+Live student finance updates.
+
+Writers call notify_students(); the new debt / is_paid / is_late of each
+student goes out through Postgres NOTIFY, so every worker process hears it.
+Each process runs one LISTEN thread that fans the messages out to its SSE
+subscribers (see core.views.student_events, which needs the ASGI app).
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+from .querysets import student_finance
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "centro_events"
+NOTIFY_BATCH = 50          # rows per NOTIFY, keeps payloads well under 8 kB
+SUBSCRIBER_BUFFER = 100    # slow clients drop messages instead of growing memory
+
+
+# ─── PUBLISH ──────────────────────────────────────────────────────────────────
+
+def notify_students(student_ids, deleted: bool = False):
+    """Queue a finance update for *student_ids*, sent once the transaction commits."""
+    ids = sorted({pk for pk in student_ids if pk is not None})
+    if ids:
+        transaction.on_commit(lambda: _send(ids, deleted))
+
+
+def _send(ids, deleted):
+    try:
+        _notify(ids, deleted)
+    except DatabaseError:
+        # live updates are best effort – never fail the write that caused them
+        logger.exception("could not publish finance update for students %s", ids)
+
+
+def _rows(ids, deleted):
+    """One message per student: its month totals, or just the deletion."""
+    if deleted:
+        return [{"student": pk, "deleted": True} for pk in ids]
+    return [
+        {
+            "student":    row["id"],
+            "amount_due": row["amount_due"],
+            "debt":       row["debt"],
+            "is_paid":    row["is_paid"],
+            "is_late":    row["is_late"],
+        }
+        for row in student_finance()
+        .filter(pk__in=ids)
+        .values("id", "amount_due", "debt", "is_paid", "is_late")
+    ]
+
+
+def _notify(ids, deleted):
+    rows = _rows(ids, deleted)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), NOTIFY_BATCH):
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)",
+                [CHANNEL, json.dumps(rows[start:start + NOTIFY_BATCH])],
+            )
+
+
+# ─── SUBSCRIBE ────────────────────────────────────────────────────────────────
+
+class Broadcaster:
+    """Fans messages from the LISTEN thread out to per-client asyncio queues."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self) -> asyncio.Queue:
+        self._ensure_listener()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = {s for s in self._subscribers if s[1] is not queue}
+
+    def publish(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="centro-events", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                # a dedicated connection straight from the driver: it must not
+                # come from (and never return to) the DB_POOL connection pool
+                wrapper = connections["default"]
+                conn = wrapper.Database.connect(**wrapper.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                backoff = 1
+                while True:
+                    for payload in _notifications(conn, timeout=30):
+                        self.publish(payload)
+            except Exception:
+                logger.exception("event listener lost its connection; retrying in %ss", backoff)
+                if conn is not None:
+                    conn.close()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+def _notifications(conn, timeout: float):
+    """Payloads received on *conn* within *timeout* seconds (psycopg 3 or 2)."""
+    if is_psycopg3:
+        for notify in conn.notifies(timeout=timeout):
+            yield notify.payload
+        return
+    if select.select([conn], [], [], timeout) == ([], [], []):
+        return
+    conn.poll()
+    while conn.notifies:
+        yield conn.notifies.pop(0).payload
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,148 @@
+# core/fastlist.py
+"""
+Fast read path for large list endpoints.
+
+Instead of running a ModelSerializer per row, list() asks the database for
+exactly the serializer's fields with .values() (computed fields become SQL
+expressions) and hands plain dicts to an orjson-backed renderer.  The output
+keeps the serializer's field names, order and formats; `?fast=0` falls back
+to the serializer for comparison.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import BooleanField, CharField, Case, F, Q, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from .models import CUTOFF_DAY
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; DRF's encoder is used without it
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def _drf_datetime(value: datetime) -> str:
+    # same output as serializers.DateTimeField
+    value = timezone.localtime(value).isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+class FastListMixin:
+    """
+    Serve list() from .values() rows.
+
+    `fast_list_fields` maps output name → field path or expression, in the
+    serializer's field order; override `get_fast_list_fields()` for fields
+    that depend on the request date.
+    """
+    fast_list_fields: dict = {}
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_fast_list_fields(self) -> dict:
+        return self.fast_list_fields
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("fast") == "0" or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(fast_rows(queryset, self.get_fast_list_fields()))
+
+
+def _fast_values(queryset, fields: dict):
+    # every field is selected under a private alias so computed outputs can
+    # reuse names the queryset already annotates (e.g. is_late)
+    aliases = {
+        f"_fast_{name}": F(spec) if isinstance(spec, str) else spec
+        for name, spec in fields.items()
+    }
+    pairs = [(name, f"_fast_{name}") for name in fields]
+    return queryset.values(**aliases), pairs
+
+
+def _fast_row(values: dict, pairs) -> dict:
+    row = {}
+    for name, alias in pairs:
+        value = values[alias]
+        if isinstance(value, datetime):
+            value = _drf_datetime(value)
+        row[name] = value
+    return row
+
+
+def fast_rows(queryset, fields: dict) -> list[dict]:
+    values, pairs = _fast_values(queryset, fields)
+    return [_fast_row(row, pairs) for row in values]
+
+
+async def afast_rows(queryset, fields: dict) -> list[dict]:
+    """fast_rows() through the async ORM, for views served by the ASGI app."""
+    values, pairs = _fast_values(queryset, fields)
+    return [_fast_row(row, pairs) async for row in values]
+
+
+def dumps(data) -> bytes:
+    """Encode like FastJSONRenderer, for plain Django views."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+    return JSONRenderer().render(data)
+
+
+# ─── SQL versions of the Python-computed serializer fields ───────────────────
+
+def display_cuil_expr(today: date | None = None, prefix: str = ""):
+    """Student.display_cuil: CUIL plus " (padre/madre)" for minors."""
+    today = today or date.today()
+    return Case(
+        When(
+            **{f"{prefix}birth_date__gt": today - timedelta(days=18 * 365)},
+            then=Concat(F(f"{prefix}cuil"), Value(" (padre/madre)")),
+        ),
+        default=F(f"{prefix}cuil"),
+        output_field=CharField(),
+    )
+
+
+def payment_is_paid_expr():
+    """PaymentSerializer.get_is_paid."""
+    return Case(
+        When(amount_paid__gte=F("amount_due"), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+
+
+def payment_is_late_expr(today: date | None = None):
+    """PaymentSerializer.get_is_late: unpaid, joined on/before the cutoff, after the cutoff."""
+    today = today or date.today()
+    if today.day <= CUTOFF_DAY:
+        return Value(False, output_field=BooleanField())
+    return Case(
+        When(
+            Q(amount_paid__gte=F("amount_due")),
+            then=Value(False),
+        ),
+        When(enrollment__start__day__lte=CUTOFF_DAY, then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
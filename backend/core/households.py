@@ -0,0 +1,85 @@
+# core/households.py
+from datetime import date
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, JSONObject
+from django.utils import timezone
+
+from .models import Household, Payment, Student, groupable_cuil
+
+
+def household_for(cuil: str) -> Household | None:
+    """The household of *cuil*; None for the placeholder or malformed CUILs."""
+    if not groupable_cuil(cuil):
+        return None
+    household, _ = Household.objects.get_or_create(cuil=cuil)
+    return household
+
+
+def refresh_households(household_ids=None, today: date | None = None) -> int:
+    """
+    Recompute size, debt and credit of the given households (all when None)
+    in a single UPDATE.  debt is what the members still owe on this month's
+    payments; credit is the sum of their credit balances.
+    """
+    today = today or date.today()
+    households = Household.objects.all()
+    if household_ids is not None:
+        ids = {pk for pk in household_ids if pk is not None}
+        if not ids:
+            return 0
+        households = households.filter(pk__in=ids)
+
+    members = Student.objects.filter(household=OuterRef("pk")).order_by().values("household")
+    unpaid = (
+        Payment.objects
+        .filter(
+            enrollment__student__household=OuterRef("pk"),
+            due_date__year=today.year,
+            due_date__month=today.month,
+        )
+        .order_by()
+        .values("enrollment__student__household")
+    )
+    return households.update(
+        size=Coalesce(Subquery(members.annotate(n=Count("pk")).values("n")), 0),
+        credit=Coalesce(Subquery(members.annotate(c=Sum("credit_balance")).values("c")), 0),
+        debt=Coalesce(
+            Subquery(
+                unpaid.annotate(
+                    d=Sum(Greatest(F("amount_due") - Coalesce(F("amount_paid"), 0), 0))
+                ).values("d")
+            ),
+            0,
+        ),
+        rolled_up_on=today,
+        updated_at=timezone.now(),
+    )
+
+
+def households_with_dues(today: date | None = None):
+    """
+    Households with every member's payment for the month as a JSON list
+    (`dues`), so a household and all its dues come back in one query.
+    """
+    today = today or date.today()
+    payment = "members__enrollments__payments"
+    return Household.objects.annotate(
+        dues=ArrayAgg(
+            JSONObject(
+                student=F("members__id"),
+                DNI=F("members__DNI"),
+                first_name=F("members__first_name"),
+                last_name=F("members__last_name"),
+                payment=F(f"{payment}__id"),
+                class_name=F("members__enrollments__option__klass__name"),
+                due_date=F(f"{payment}__due_date"),
+                amount_due=F(f"{payment}__amount_due"),
+                amount_paid=F(f"{payment}__amount_paid"),
+            ),
+            filter=Q(**{f"{payment}__due_date__year": today.year, f"{payment}__due_date__month": today.month}),
+            ordering=("members__last_name", "members__first_name", f"{payment}__id"),
+            default=Value([]),
+        )
+    )
@@ -0,0 +1,83 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from core.models import Class, ClassOption, Enrollment, Payment, PricePlan, Student
+
+ENDPOINTS = ["/api/students/", "/api/payments/", "/api/payments-simple/"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare list endpoints served by the serializers (?fast=0) and by the fast values() path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Create this many throw-away students (rolled back afterwards).")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options["seed"]:
+                    self._seed(options["seed"])
+                self._bench(options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _bench(self, repeat):
+        client = APIClient(SERVER_NAME="localhost")
+        self.stdout.write(f"{'endpoint':<24}{'rows':>7}{'serializer ms':>16}{'fast ms':>10}{'speedup':>9}")
+        for url in ENDPOINTS:
+            slow = self._time(client, f"{url}?format=json&fast=0", repeat)
+            fast = self._time(client, f"{url}?format=json", repeat)
+            rows = len(client.get(f"{url}?format=json").json())
+            self.stdout.write(
+                f"{url:<24}{rows:>7}{slow * 1000:>16.1f}{fast * 1000:>10.1f}{slow / fast:>8.1f}x"
+            )
+
+    @staticmethod
+    def _time(client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+        return statistics.median(timings)
+
+    def _seed(self, count):
+        klass  = Class.objects.create(name=f"bench-{time.time_ns()}")
+        option = ClassOption.objects.create(identifier="B", klass=klass, weekly_sessions=1)
+        PricePlan.objects.create(option=option, cycle="M", base_price=10000)
+
+        today = date.today()
+        students = Student.objects.bulk_create(
+            Student(
+                DNI=f"9{i:09d}", first_name=f"Nombre{i}", last_name=f"Apellido{i}",
+                birth_date=today - timedelta(days=365 * (8 + i % 40)),
+                cuil=f"{20_000_000_000 + i}", is_family_member=i % 3 == 0,
+            )
+            for i in range(count)
+        )
+        # bulk_create skips the post_save signal, so payments are created here
+        enrollments = Enrollment.objects.bulk_create(
+            Enrollment(student=student, option=option, start=today.replace(day=1 + i % 28))
+            for i, student in enumerate(students)
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                enrollment=enrollment, cycle="M", due_date=today.replace(day=28), method="transfer",
+                amount_due=10000, amount_paid=10000 if i % 2 else None,
+                paid_on=today if i % 2 else None, priced_on=today,
+            )
+            for i, enrollment in enumerate(enrollments)
+        )
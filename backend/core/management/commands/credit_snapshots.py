@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.credit import credit_cache_mismatches, take_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshot every student's credit ledger balance (run periodically, e.g. "
+        "monthly) and optionally check credit_balance against the ledger."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true",
+                            help="Fail if any credit_balance differs from its ledger sum.")
+
+    def handle(self, *args, **options):
+        created = take_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"{created} snapshot(s) taken"))
+
+        if options["verify"]:
+            mismatches = list(credit_cache_mismatches())
+            for row in mismatches:
+                self.stderr.write(
+                    f"student {row['id']} ({row['DNI']}): credit_balance={row['credit_balance']} "
+                    f"ledger={row['ledger']}"
+                )
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} student(s) out of sync with the ledger")
+            self.stdout.write(self.style.SUCCESS("credit_balance matches the ledger"))
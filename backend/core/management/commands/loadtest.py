@@ -0,0 +1,94 @@
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer running HTTP endpoints and report throughput and latency percentiles. "
+        "Run it once per serving profile (e.g. GUNICORN_WORKER_CLASS=sync DB_CONN_MAX_AGE=0 "
+        "vs. the defaults) and compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="Full URLs, e.g. http://localhost:8000/api/students/")
+        parser.add_argument("--concurrency", default="8",
+                            help="Comma-separated client counts to try, e.g. 1,8,32.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per URL and concurrency level.")
+        parser.add_argument("--host", default=None, help="Host header to send (must be in ALLOWED_HOSTS).")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of integers")
+
+        self.stdout.write(
+            f"{'url':<40}{'clients':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+        )
+        for url in options["urls"]:
+            for clients in levels:
+                result = run(url, clients, options["duration"], options["host"])
+                self.stdout.write(
+                    f"{urlsplit(url).path[:39]:<40}{clients:>8}{result['rps']:>9.1f}"
+                    f"{result['p50']:>9.1f}{result['p95']:>9.1f}{result['p99']:>9.1f}{result['errors']:>8}"
+                )
+
+
+def run(url: str, clients: int, duration: float, host: str | None) -> dict:
+    parts = urlsplit(url)
+    path  = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = {"Host": host or parts.netloc, "Accept": "application/json"}
+    deadline = time.monotonic() + duration
+
+    latencies, errors, lock = [], [0], threading.Lock()
+
+    def client():
+        own, failed = [], 0
+        conn = None
+        while time.monotonic() < deadline:
+            if conn is None:
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+                else:
+                    own.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": p50 * 1000,
+        "p95": p95 * 1000,
+        "p99": p99 * 1000,
+        "errors": errors[0],
+    }
@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.households import refresh_households
+from core.models import Household
+from core.services import reprice_family_discounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every household's debt and credit rollup for the month. "
+        "Meant to run nightly (cron), so the rollup follows the month change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, default=None,
+                            help="Roll up the month of this date (YYYY-MM-DD), defaults to today.")
+        parser.add_argument("--reprice", action="store_true",
+                            help="Also apply family-discount changes to the month's unpaid payments.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="With --reprice, show the deltas without writing them.")
+
+    def handle(self, *args, **options):
+        today = options["date"]
+        if options["reprice"]:
+            dry_run = options["dry_run"]
+            changes = reprice_family_discounts(
+                Household.objects.values_list("pk", flat=True), today, dry_run=dry_run,
+            )
+            for payment, old, new in changes:
+                self.stdout.write(f"payment {payment.pk}: {old} -> {new} ({new - old:+d})")
+            verb = "would reprice" if dry_run else "repriced"
+            self.stdout.write(f"{verb} {len(changes)} payment(s)")
+            if dry_run:
+                return
+
+        updated = refresh_households(today=today)
+        self.stdout.write(self.style.SUCCESS(f"refreshed {updated} household(s)"))
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.services import reprice_late_payments
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the late penalty to unpaid payments that crossed the cutoff day "
+        "since they were priced. Meant to run nightly (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, default=None,
+                            help="Reprice as of this date (YYYY-MM-DD), defaults to today.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Show the deltas without writing them.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        changes = reprice_late_payments(options["date"], dry_run=dry_run)
+        for payment, old, new in changes:
+            self.stdout.write(f"payment {payment.pk}: {old} -> {new} ({new - old:+d})")
+
+        total = sum(new - old for _, old, new in changes)
+        verb  = "would reprice" if dry_run else "repriced"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(changes)} payment(s), total {total:+d}"))
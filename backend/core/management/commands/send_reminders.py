@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from billing.reminders import get_transport, send_late_reminders
+
+
+class Command(BaseCommand):
+    help = "Send one payment reminder per period to every late student."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, default=None,
+                            help="Evaluate lateness as of this date (YYYY-MM-DD), defaults to today.")
+        parser.add_argument("--transport", default=None,
+                            help="Dotted path of the transport class, defaults to REMINDER_TRANSPORT.")
+        parser.add_argument("--concurrency", type=int, default=None)
+        parser.add_argument("--rate", type=float, default=None, help="Max sends per second (0 = no limit).")
+        parser.add_argument("--dry-run", action="store_true", help="Only count who would be reminded.")
+
+    def handle(self, *args, **options):
+        metrics = send_late_reminders(
+            options["date"],
+            transport=get_transport(options["transport"]),
+            concurrency=options["concurrency"],
+            rate=options["rate"],
+            dry_run=options["dry_run"],
+        )
+        for student_id, error in metrics.errors:
+            self.stderr.write(f"student {student_id}: {error}")
+
+        self.stdout.write(
+            f"late={metrics.late} sent={metrics.sent} failed={metrics.failed} "
+            f"skipped={metrics.skipped} already_sent={metrics.already_sent} "
+            f"elapsed={metrics.elapsed:.2f}s ({metrics.per_second:.1f}/s)"
+        )
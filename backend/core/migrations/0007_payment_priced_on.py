@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_student_contact_student_cuil'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='priced_on',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    """Seed the ledger with each student's current credit so both agree."""
+    Student = apps.get_model("core", "Student")
+    CreditMovement = apps.get_model("core", "CreditMovement")
+    CreditMovement.objects.bulk_create(
+        CreditMovement(student_id=pk, amount=balance, reason="opening")
+        for pk, balance in Student.objects.filter(credit_balance__gt=0).values_list("pk", "credit_balance")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('reason', models.CharField(choices=[('opening', 'saldo inicial'), ('overpayment', 'pago excedente'), ('applied', 'crédito aplicado'), ('adjustment', 'ajuste manual')], max_length=12)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.payment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_movements', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'created_at'], name='core_credit_student_eb9fe0_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CreditSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('balance', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField()),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_snapshots', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'taken_at'], name='core_credit_student_a6ded0_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_reminder_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='due_date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
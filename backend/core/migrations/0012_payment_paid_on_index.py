@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_payment_due_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='paid_on',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+    ]
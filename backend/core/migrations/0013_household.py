@@ -0,0 +1,67 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+# copied from core.models: migration 0006 gave every existing student this CUIL
+PLACEHOLDER_CUIL = "11111111111"
+
+
+def group_households(apps, schema_editor):
+    """
+    One household per real CUIL in use (not the 0006 placeholder, nor
+    malformed values), and the payments already priced with the family
+    discount marked as such.  The debt/credit rollup is filled by
+    `manage.py refresh_households`; prices are not touched here.
+    """
+    Household = apps.get_model("core", "Household")
+    Student = apps.get_model("core", "Student")
+    Payment = apps.get_model("core", "Payment")
+
+    Household.objects.bulk_create(
+        Household(cuil=cuil)
+        for cuil in Student.objects.order_by().values_list("cuil", flat=True).distinct()
+        if len(cuil) == 11 and cuil.isdigit() and cuil != PLACEHOLDER_CUIL
+    )
+    Student.objects.update(
+        household=Subquery(Household.objects.filter(cuil=OuterRef("cuil")).values("pk")[:1])
+    )
+    members = Student.objects.filter(household=OuterRef("pk")).order_by().values("household")
+    Household.objects.update(size=Coalesce(Subquery(members.annotate(n=Count("pk")).values("n")), 0))
+    Payment.objects.filter(enrollment__student__is_family_member=True).update(family_priced=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_payment_paid_on_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Household',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cuil', models.CharField(max_length=11, unique=True)),
+                ('size', models.PositiveSmallIntegerField(default=0)),
+                ('debt', models.PositiveIntegerField(default=0, help_text='Saldo impago del mes')),
+                ('credit', models.PositiveIntegerField(default=0, help_text='Crédito de los miembros')),
+                ('rolled_up_on', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='family_priced',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='household',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='members', to='core.household'),
+        ),
+        migrations.RunPython(group_households, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Least
+
+
+def backfill_priced_on(apps, schema_editor):
+    """
+    Payments from before 0007 have no priced_on, so reprice_late_payments
+    never picked them up.  The signal creates (and prices) a payment together
+    with its enrollment, so the enrollment start – capped at the due date –
+    is when it was priced.  Payments saved again since then (posting a
+    payment) are the paid ones, which are not repriced anyway.
+    """
+    Enrollment = apps.get_model("core", "Enrollment")
+    Payment = apps.get_model("core", "Payment")
+
+    start = Enrollment.objects.filter(pk=OuterRef("enrollment")).values("start")[:1]
+    Payment.objects.filter(priced_on__isnull=True).update(priced_on=Least(Subquery(start), "due_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_household'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_priced_on, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import date
 from decimal import Decimal
@@ -9,6 +10,36 @@ from billing.services import _round_up
 DISCOUNT_RATE = Decimal("0.10")
 LATE_PENALTY = Decimal("0.10")
 CUTOFF_DAY = 10
+# filled in by migration 0006 for students registered before the CUIL existed
+PLACEHOLDER_CUIL = "11111111111"
+
+
+def groupable_cuil(cuil: str) -> bool:
+    """Only real CUILs link students into a household."""
+    return len(cuil) == 11 and cuil.isdigit() and cuil != PLACEHOLDER_CUIL
+
+class Household(models.Model):
+    """
+    Students billed together, keyed by CUIL: minors are registered with a
+    parent's CUIL, so siblings and the parent share a household.
+    size / debt / credit cache the members' figures for the month of
+    rolled_up_on (see core.households.refresh_households).
+    """
+    cuil = models.CharField(max_length=11, unique=True)
+    size = models.PositiveSmallIntegerField(default=0)
+    debt = models.PositiveIntegerField(default=0, help_text="Saldo impago del mes")
+    credit = models.PositiveIntegerField(default=0, help_text="Crédito de los miembros")
+    rolled_up_on = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Grupo familiar {self.cuil}"
+
+    @property
+    def has_family_discount(self) -> bool:
+        """Only with HOUSEHOLD_FAMILY_DISCOUNT on; otherwise is_family_member decides."""
+        return settings.HOUSEHOLD_FAMILY_DISCOUNT and self.size >= 2
+
 
 class Student(models.Model):
     DNI = models.CharField(max_length=20, unique=True)
@@ -20,7 +51,15 @@ class Student(models.Model):
     cuil = models.CharField(max_length=11)
     contact = models.CharField(max_length=80, blank=True)
     is_family_member = models.BooleanField(default=False)
+    household = models.ForeignKey(
+        Household, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, related_name="members",
+    )
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.last_name}, {self.first_name} ({self.DNI})"
     
     def clean(self):
         if not self.cuil.isdigit() or len(self.cuil) != 11:
@@ -38,27 +77,62 @@ class Student(models.Model):
             return f"{self.cuil} (padre/madre)"
         return self.cuil
     
+    @property
+    def has_family_discount(self) -> bool:
+        """Flagged by hand, or (with HOUSEHOLD_FAMILY_DISCOUNT) sharing a household."""
+        return self.is_family_member or (
+            self.household is not None and self.household.has_family_discount
+        )
+
+    def set_credit_balance(self, balance: int, *, reason: str, payment=None):
+        """Change the cached credit_balance and append the change to the ledger."""
+        with transaction.atomic():
+            current = (
+                Student.objects.select_for_update()
+                .values_list("credit_balance", flat=True)
+                .get(pk=self.pk)
+            )
+            self.credit_balance = balance
+            self.save(update_fields=["credit_balance", "updated_at"])
+            if balance != current:
+                CreditMovement.objects.create(
+                    student=self, payment=payment, amount=balance - current, reason=reason,
+                )
+    
 class Class(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    def __str__(self):
+        return self.name
     
 class ClassOption(models.Model):
     identifier = models.CharField(max_length=10)
     klass = models.ForeignKey(Class, on_delete=models.CASCADE)
     weekly_sessions = models.PositiveSmallIntegerField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         unique_together = ('klass', 'weekly_sessions')
+    
+    def __str__(self):
+        return f"{self.klass.name} ({self.weekly_sessions}x semana)"
 
 class PricePlan(models.Model):
     BILLING = (('M', 'Mensual'), ('S', 'Semestral'))
     option = models.ForeignKey(ClassOption, on_delete=models.CASCADE)
     cycle = models.CharField(max_length=1, choices=BILLING)
     base_price = models.PositiveIntegerField(help_text="Pesos antes de descuentos")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
 class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
     option = models.ForeignKey(ClassOption, on_delete=models.PROTECT)
     start = models.DateField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.student} – {self.option}"
     
 class Payment(models.Model):
     CYCLE = PricePlan.BILLING
@@ -66,27 +140,29 @@ class Payment(models.Model):
     
     enrollment  = models.ForeignKey(Enrollment, related_name="payments", on_delete=models.CASCADE)
     cycle = models.CharField(max_length=1, choices=CYCLE, default="M")
-    due_date    = models.DateField()
-    paid_on     = models.DateField(null=True, blank=True)
+    due_date    = models.DateField(db_index=True)
+    paid_on     = models.DateField(null=True, blank=True, db_index=True)
     method      = models.CharField(max_length=8, choices=[("cash","efectivo"),("transfer","transferencia")])
     amount_due  = models.PositiveIntegerField(editable=False)
     amount_paid = models.PositiveIntegerField(null=True, blank=True)
+    priced_on   = models.DateField(null=True, blank=True, editable=False, db_index=True)
+    # family-discount eligibility amount_due was computed with
+    family_priced = models.BooleanField(default=False, editable=False)
+    updated_at  = models.DateTimeField(auto_now=True, db_index=True)
     
-    def _calc_amount_due(self) -> int:
-        """
-        Base price ± late-penalty ± one possible discount.
-
-        Late penalty (10 %) applies **only** when:
-        • today is after the 10th, AND
-        • the student enrolled on/before the 10th of the same month
-        """
-        plan   = PricePlan.objects.get(option=self.enrollment.option, cycle=self.cycle)
-        total  = Decimal(plan.base_price)
-
-        today                = timezone.now().date()
+    def is_late_on(self, today: date) -> bool:
         joined_before_cutoff = self.enrollment.start.day <= CUTOFF_DAY
         after_cutoff_today   = today.day > CUTOFF_DAY
-        is_late              = joined_before_cutoff and after_cutoff_today
+        return joined_before_cutoff and after_cutoff_today
+
+    def _price(self, plan: PricePlan, *, is_late: bool, credit: int, family: bool | None = None) -> int:
+        """
+        Base price ± late-penalty ± one possible discount − credit.
+        `family` defaults to the student's current household eligibility.
+        """
+        if family is None:
+            family = self.enrollment.student.has_family_discount
+        total = Decimal(plan.base_price)
 
         if is_late:
             total += total * LATE_PENALTY      # +10 %
@@ -94,10 +170,9 @@ class Payment(models.Model):
         if self.cycle == "M":                  # discounts allowed only for monthly
             if not is_late and self.method == "cash":
                 total -= total * DISCOUNT_RATE            # 10 % cash discount
-            elif self.method == "transfer" and self.enrollment.student.is_family_member:
+            elif self.method == "transfer" and family:
                 total -= total * DISCOUNT_RATE            # 10 % family + transfer
 
-        credit = self.enrollment.student.credit_balance
         if credit:
             total -= Decimal(credit)
             if total < 0:
@@ -105,8 +180,26 @@ class Payment(models.Model):
     
         return _round_up(total)
 
+    def _calc_amount_due(self, today: date | None = None, plan: PricePlan | None = None) -> int:
+        """
+        Base price ± late-penalty ± one possible discount.
+
+        Late penalty (10 %) applies **only** when:
+        • today is after the 10th, AND
+        • the student enrolled on/before the 10th of the same month
+        """
+        plan  = plan or PricePlan.objects.get(option=self.enrollment.option, cycle=self.cycle)
+        today = today or timezone.now().date()
+        return self._price(
+            plan,
+            is_late=self.is_late_on(today),
+            credit=self.enrollment.student.credit_balance,
+        )
+
     def save(self, *args, **kwargs):
-        self.amount_due = self._calc_amount_due()
+        self.priced_on  = timezone.now().date()
+        self.family_priced = self.enrollment.student.has_family_discount
+        self.amount_due = self._calc_amount_due(self.priced_on)
         super().save(*args, **kwargs)
         
         student = self.enrollment.student
@@ -115,10 +208,72 @@ class Payment(models.Model):
         
         if diff != 0:
             new_credit = max(diff, 0)
-            student.credit_balance = new_credit
-            student.save(update_fields=["credit_balance"])
+            student.set_credit_balance(
+                new_credit,
+                reason="overpayment" if new_credit else "applied",
+                payment=self,
+            )
 
     def amount_due_for(self) -> int:
         """Convenience helper to recalc without saving."""
         return self._calc_amount_due()
-    
\ No newline at end of file
+
+
+class Tombstone(models.Model):
+    """Marks a deleted row so sync clients can drop it from their local cache."""
+    model      = models.CharField(max_length=30)
+    object_id  = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+class CreditMovement(models.Model):
+    """
+    Append-only ledger of Student.credit_balance changes (signed amounts).
+    The column on Student is a cache of SUM(amount) per student.
+    """
+    REASONS = (
+        ("opening",     "saldo inicial"),
+        ("overpayment", "pago excedente"),
+        ("applied",     "crédito aplicado"),
+        ("adjustment",  "ajuste manual"),
+    )
+    student    = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="credit_movements")
+    payment    = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True)
+    amount     = models.IntegerField()
+    reason     = models.CharField(max_length=12, choices=REASONS)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["student", "created_at"])]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Credit movements are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Credit movements are append-only.")
+
+
+class CreditSnapshot(models.Model):
+    """Student balance including every movement up to last_movement_id."""
+    student          = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="credit_snapshots")
+    taken_at         = models.DateTimeField(default=timezone.now)
+    balance          = models.IntegerField()
+    last_movement_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["student", "taken_at"])]
+
+
+class ReminderLog(models.Model):
+    """One payment reminder per student and period (YYYY-MM)."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="reminders")
+    period  = models.CharField(max_length=7)
+    channel = models.CharField(max_length=20)
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["student", "period"], name="one_reminder_per_period"),
+        ]
@@ -0,0 +1,194 @@
+# core/profiling.py
+"""
+On-demand request profiling for staff.
+
+Add `?profile=1` to any URL while logged in as staff (e.g. through /admin/).
+The request is sampled every PROFILING_INTERVAL seconds and its SQL captured;
+the result is stored in PROFILE_DIR as
+
+  <id>.folded  collapsed stacks (flamegraph.pl, speedscope, inferno)
+  <id>.txt     text report: timings, SQL list, hottest functions
+
+and served back from /api/profiles/<id>.txt|.folded.  Requests without the
+flag only pay one substring check; with PROFILING_ENABLED off the middleware
+is not even loaded.  Under ASGI requests pass straight through: the sampler
+and SQL capture follow a single thread, so profile on the WSGI deployment.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.core.signals import request_started
+from django.db import connections, reset_queries
+from django.http import FileResponse, Http404
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+PROFILE_FLAG = "profile=1"
+TOP = 25
+
+
+class _Sampler(threading.Thread):
+    """Collects the stack of one thread every `interval` seconds."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval  = interval
+        self.stacks    = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _short(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, str(settings.BASE_DIR) + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+
+class _LazyCapture(CaptureQueriesContext):
+    """
+    CaptureQueriesContext that doesn't connect on entry: an alias the
+    request never uses (e.g. a replica that is down) is never opened.
+    """
+
+    def __enter__(self):
+        self.force_debug_cursor = self.connection.force_debug_cursor
+        self.connection.force_debug_cursor = True
+        self.initial_queries = len(self.connection.queries_log)
+        self.final_queries = None
+        request_started.disconnect(reset_queries)
+        return self
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^\w]+", "-", text).strip("-")[:60] or "root"
+
+
+class ProfilingMiddleware:
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.get_response(request)
+        if PROFILE_FLAG not in request.META.get("QUERY_STRING", ""):
+            return self.get_response(request)
+        if request.GET.get("profile") != "1" or not getattr(request.user, "is_staff", False):
+            return self.get_response(request)
+        return self.profile(request)
+
+    def profile(self, request):
+        sampler = _Sampler(threading.get_ident(), settings.PROFILING_INTERVAL)
+        with ExitStack() as stack:
+            captures = {
+                alias: stack.enter_context(_LazyCapture(connections[alias]))
+                for alias in settings.DATABASES
+            }
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.route if match is not None else request.path
+        profile_id = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{_slug(route)}"
+
+        queries = [
+            (alias, float(q["time"]), q["sql"])
+            for alias, capture in captures.items()
+            for q in capture.captured_queries
+        ]
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{profile_id}.folded").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sampler.stacks.items()),
+            encoding="utf-8",
+        )
+        (directory / f"{profile_id}.txt").write_text(
+            _report(request, route, response.status_code, elapsed, sampler, queries),
+            encoding="utf-8",
+        )
+
+        response["X-Profile-Id"] = profile_id
+        response["X-Profile-Report"] = f"/api/profiles/{profile_id}.txt"
+        return response
+
+
+def _report(request, route, status, elapsed, sampler, queries) -> str:
+    samples   = sum(sampler.stacks.values())
+    sql_time  = sum(seconds for _, seconds, _ in queries)
+    own       = Counter()
+    inclusive = Counter()
+    for stack, count in sampler.stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for name in set(frames):
+            inclusive[name] += count
+
+    def pct(count):
+        return f"{100 * count / samples:5.1f}%" if samples else "    -"
+
+    lines = [
+        f"{request.method} {request.get_full_path()}",
+        f"route:    {route}",
+        f"status:   {status}",
+        f"wall:     {elapsed * 1000:.1f} ms",
+        f"sql:      {len(queries)} queries, {sql_time * 1000:.1f} ms",
+        f"samples:  {samples} every {sampler.interval * 1000:.1f} ms",
+        "",
+        f"── SQL ({len(queries)}) " + "─" * 50,
+    ]
+    lines += [f"{seconds * 1000:8.1f} ms  [{alias}]  {sql}" for alias, seconds, sql in queries]
+    lines += ["", "── hottest functions (self) " + "─" * 40]
+    lines += [f"{pct(count)}  {name}" for name, count in own.most_common(TOP)]
+    lines += ["", "── hottest functions (inclusive) " + "─" * 35]
+    lines += [f"{pct(count)}  {name}" for name, count in inclusive.most_common(TOP)]
+    return "\n".join(lines) + "\n"
+
+
+def profile_report(request, profile_id, fmt):
+    if not getattr(request.user, "is_staff", False):
+        raise PermissionDenied
+    path = Path(settings.PROFILE_DIR) / f"{profile_id}.{fmt}"
+    if not path.is_file():
+        raise Http404
+    return FileResponse(open(path, "rb"), content_type="text/plain; charset=utf-8")
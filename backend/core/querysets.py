@@ -2,95 +2,135 @@
 from datetime import date
 
 from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
 from django.db.models import (
     BooleanField,
     Case,
+    CharField,
     Count,
+    Exists,
     F,
-    IntegerField,
+    OuterRef,
     Q,
+    Subquery,
     Sum,
     Value,
     When,
 )
-from django.db.models.functions import Coalesce, ExtractDay
+from django.db.models.functions import Coalesce
 
-from .models import CUTOFF_DAY, Student
+from .models import CUTOFF_DAY, ClassOption, Enrollment, Payment, PricePlan, Student
 
 def student_with_finance(today: date | None = None):
     """
     One-row-per-student queryset with:
-      • list of class names  → enrolled_classes  (ArrayAgg)
+      • list of class names  → enrolled_classes
       • number of classes    → enrolled_count
-      • amount due / paid for current month
-      • debt  = due − paid
-      • is_paid  = debt ≤ 0
-      • is_late  = debt > 0  AND  student joined on/before 10th  AND  today > 10th
+      • everything student_finance() annotates: amount due / paid for the
+        current month, debt, is_paid, is_late
+
+    Class names and counts come from correlated subqueries like the money
+    columns, so no join splits a student into several rows.
+    """
+    enrollments = Enrollment.objects.filter(student=OuterRef("pk")).order_by().values("student")
+    return student_finance(today).annotate(
+        enrolled_classes=Coalesce(
+            Subquery(
+                enrollments.annotate(names=ArrayAgg("option__klass__name", distinct=True)).values("names")
+            ),
+            Value([]),
+            output_field=ArrayField(CharField()),
+        ),
+        enrolled_count=Coalesce(
+            Subquery(
+                enrollments.annotate(n=Count("option__klass", distinct=True)).values("n")
+            ),
+            0,
+        ),
+    )
+
+
+def class_options_with_prices():
+    """ClassOption rows with their monthly / biannual base price in the same query."""
+    plans = PricePlan.objects.filter(option=OuterRef("pk")).order_by("pk")
+    return (
+        ClassOption.objects
+        .select_related("klass")
+        .annotate(
+            monthly_price=Subquery(plans.filter(cycle="M").values("base_price")[:1]),
+            biannual_price=Subquery(plans.filter(cycle="S").values("base_price")[:1]),
+        )
+    )
+
+
+def student_finance(today: date | None = None):
+    """
+    Exactly one row per student with this month's amount_due / amount_paid,
+    debt (net of credit), joined_before_cutoff, is_paid and is_late
+      • is_late = debt > 0  AND  student joined on/before 10th  AND  today > 10th
+    Month totals come from correlated subqueries, so a student with several
+    enrollments is neither split nor counted twice.
     """
     today = today or date.today()
-    after_cutoff_today = today.day > CUTOFF_DAY  # bool in Python
+    month = (
+        Payment.objects
+        .filter(
+            enrollment__student=OuterRef("pk"),
+            due_date__year=today.year,
+            due_date__month=today.month,
+        )
+        .order_by()
+        .values("enrollment__student")
+    )
+
+    def month_total(field):
+        return Coalesce(Subquery(month.annotate(total=Sum(field)).values("total")), 0)
 
     qs = (
         Student.objects
-        # ── aggregates ────────────────────────────────────────────────────
+        .annotate(amount_due=month_total("amount_due"), amount_paid=month_total("amount_paid"))
         .annotate(
-            enrolled_classes=ArrayAgg(
-                "enrollments__option__klass__name",
-                distinct=True,
-            ),
-            enrolled_count=Count(
-                "enrollments__option__klass",
-                distinct=True,
-            ),
-            amount_due=Coalesce(
-                Sum(
-                    "enrollments__payments__amount_due",
-                    filter=Q(enrollments__payments__due_date__month=today.month),
-                ),
-                0,
-            ),
-            amount_paid=Coalesce(
-                Sum(
-                    "enrollments__payments__amount_paid",
-                    filter=Q(enrollments__payments__due_date__month=today.month),
-                ),
-                0,
+            debt=F("amount_due") - F("amount_paid") - F("credit_balance"),
+            joined_before_cutoff=Exists(
+                Enrollment.objects.filter(student=OuterRef("pk"), start__day__lte=CUTOFF_DAY)
             ),
         )
-        # ── helpers ───────────────────────────────────────────────────────
-        .annotate(
-            debt=F("amount_due") - F("amount_paid") - F('credit_balance'),
-            joined_day=ExtractDay("enrollments__start", output_field=IntegerField()),
-        )
-        # ── base flags ────────────────────────────────────────────────────
         .annotate(
             is_paid=Case(
                 When(debt__lte=0, then=Value(True)),
                 default=Value(False),
                 output_field=BooleanField(),
             ),
-            joined_before_cutoff=Case(
-                When(joined_day__lte=CUTOFF_DAY, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField(),
-            ),
         )
     )
-
-    # ── late flag depends on today's date ────────────────────────────────
-    if after_cutoff_today:
-        qs = qs.annotate(
+    # nobody is late until the cutoff passes
+    if today.day > CUTOFF_DAY:
+        return qs.annotate(
             is_late=Case(
-                When(
-                    Q(debt__gt=0) & Q(joined_before_cutoff=True),
-                    then=Value(True),
-                ),
+                When(Q(debt__gt=0) & Q(joined_before_cutoff=True), then=Value(True)),
                 default=Value(False),
                 output_field=BooleanField(),
             )
         )
-    else:
-        # before or on the 10th: nobody is "late" yet
-        qs = qs.annotate(is_late=Value(False, output_field=BooleanField()))
+    return qs.annotate(is_late=Value(False, output_field=BooleanField()))
+
 
-    return qs
+def finance_summary(today: date | None = None):
+    """
+    (queryset, aggregates) for the dashboard totals of the current month:
+    active students, total due / paid / debt, paid and late counts.
+    Evaluate with .aggregate(**aggregates) or, from async views, .aaggregate().
+    The queryset is student_finance(), so every student counts once.
+    """
+    return (
+        student_finance(today).filter(active=True),
+        {
+            "students":    Count("id"),
+            # keys must not reuse the annotation names they aggregate
+            "total_due":   Coalesce(Sum("amount_due"), 0),
+            "total_paid":  Coalesce(Sum("amount_paid"), 0),
+            "total_debt":  Coalesce(Sum("debt", filter=Q(debt__gt=0)), 0),
+            "paid":        Count("id", filter=Q(is_paid=True)),
+            "late":        Count("id", filter=Q(is_late=True)),
+        },
+    )
@@ -0,0 +1,144 @@
+# core/replica.py
+"""
+Optional read replica.
+
+Set POSTGRES_REPLICA_HOST (and POSTGRES_REPLICA_PORT) to add a `replica`
+database.  Viewsets opt in with ReplicaReadMixin: their GET/HEAD requests read
+from the replica unless
+
+  • the request already wrote something (read-after-write stays on primary), or
+  • the replica lags more than REPLICA_MAX_LAG seconds or is unreachable.
+
+Async read views (core.async_views) call read_from_replica() themselves.
+Everything else keeps using `default`.  Locally, two Postgres instances on
+different ports are enough to try it (the second one doesn't even need to be
+a real streaming replica: lag is reported as 0 when it is not in recovery).
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+REPLICA = "replica"
+
+_use_replica = ContextVar("use_replica", default=False)
+_wrote       = ContextVar("wrote", default=False)
+
+_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class _LagProbe:
+    """Caches the replica's health for REPLICA_LAG_CHECK_INTERVAL seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = float("-inf")
+        self._healthy = False
+
+    def healthy(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return self._healthy
+        with self._lock:
+            if now - self._checked >= settings.REPLICA_LAG_CHECK_INTERVAL:
+                self._healthy = self._probe()
+                self._checked = now
+        return self._healthy
+
+    @staticmethod
+    def _probe() -> bool:
+        try:
+            with connections[REPLICA].cursor() as cursor:
+                cursor.execute(_LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.warning("read replica unreachable, reading from primary", exc_info=True)
+            return False
+        if lag > settings.REPLICA_MAX_LAG:
+            logger.warning("read replica %.1fs behind, reading from primary", lag)
+            return False
+        return True
+
+
+lag_probe = _LagProbe()
+
+
+def replica_configured() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _wrote.get() and lag_probe.healthy():
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def read_from_replica():
+    """Let the rest of the current request read from the replica, if there is one."""
+    if replica_configured():
+        _use_replica.set(True)
+
+
+class ReplicaMiddleware:
+    """Starts every request on the primary; viewsets opt in to the replica."""
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        use_token   = _use_replica.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            _use_replica.reset(use_token)
+            _wrote.reset(wrote_token)
+
+    async def __acall__(self, request):
+        use_token   = _use_replica.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            return await self.get_response(request)
+        finally:
+            _use_replica.reset(use_token)
+            _wrote.reset(wrote_token)
+
+
+class ReplicaReadMixin:
+    """Viewset opt-in: safe (read-only) requests may be served by the replica."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            read_from_replica()
@@ -11,6 +11,7 @@ from .models import (
     PricePlan,
     Enrollment,
     Payment,
+    Household,
 )
 
 
@@ -36,9 +37,17 @@ class StudentSerializer(serializers.ModelSerializer):
             'id', 'DNI', 'display_cuil', 'first_name', 'last_name', 'birth_date', 'contact', 'active',
             'is_family_member', 'created_at',
             'enrolled_classes', 'enrolled_count', 'is_paid', 'is_late', 'amount_due', 'debt',
-            'has_family', 'credit_balance' 
+            'has_family', 'credit_balance', 'household',
         ]
 
+    def update(self, instance, validated_data):
+        # credit changes go through the ledger, never straight to the column
+        credit = validated_data.pop('credit_balance', None)
+        instance = super().update(instance, validated_data)
+        if credit is not None and credit != instance.credit_balance:
+            instance.set_credit_balance(credit, reason='adjustment')
+        return instance
+
 
 # ─── CLASS ────────────────────────────────────────────────────────────────────
 
@@ -52,12 +61,9 @@ class ClassSerializer(serializers.ModelSerializer):
 
 class ClassOptionSerializer(serializers.ModelSerializer):
     class_name      = serializers.CharField(source='klass.name', read_only=True)
-    monthly_price   = serializers.IntegerField(
-        source='priceplan_set.filter(cycle="M").first.base_price', read_only=True
-    )
-    biannual_price  = serializers.IntegerField(
-        source='priceplan_set.filter(cycle="S").first.base_price', read_only=True
-    )
+    # values are supplied by the annotated queryset in class_options_with_prices()
+    monthly_price   = serializers.IntegerField(read_only=True)
+    biannual_price  = serializers.IntegerField(read_only=True)
 
     class Meta:
         model  = ClassOption
@@ -167,3 +173,14 @@ class StudentCreateSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         return StudentSerializer(instance).data
+
+
+# ─── HOUSEHOLD ────────────────────────────────────────────────────────────────
+
+class HouseholdSerializer(serializers.ModelSerializer):
+    # supplied by the annotated queryset in households_with_dues()
+    dues = serializers.ListField(child=serializers.DictField(), read_only=True)
+
+    class Meta:
+        model  = Household
+        fields = ['id', 'cuil', 'size', 'debt', 'credit', 'rolled_up_on', 'dues']
@@ -0,0 +1,186 @@
+# core/services.py
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .events import notify_students
+from .households import refresh_households
+from .models import CUTOFF_DAY, Payment, PricePlan
+
+logger = logging.getLogger(__name__)
+
+
+def payments_crossing_cutoff(today: date | None = None):
+    """
+    Unpaid payments priced this month on/before the cutoff whose student
+    joined on/before the cutoff – i.e. the ones whose late status flipped
+    once the 10th passed and still carry the on-time price.
+    """
+    today = today or date.today()
+    if today.day <= CUTOFF_DAY:
+        return Payment.objects.none()
+
+    month_start = today.replace(day=1)
+    return (
+        Payment.objects
+        .filter(
+            priced_on__range=(month_start, today.replace(day=CUTOFF_DAY)),
+            enrollment__start__day__lte=CUTOFF_DAY,
+        )
+        .filter(Q(amount_paid__isnull=True) | Q(amount_paid__lt=F("amount_due")))
+        .select_related("enrollment__student")
+    )
+
+
+def reprice_late_payments(today: date | None = None, *, queryset=None, dry_run: bool = False):
+    """
+    Apply the late penalty to payments that crossed the cutoff since they were
+    priced.  Only the delta between the late and on-time price is added, so any
+    credit consumed when the payment was first saved is preserved.
+
+    The payments are locked from the read to the write, so a payment posted
+    meanwhile (Payment.save reprices it) waits and is then left out by the
+    filters, instead of getting a stale amount written over it.
+
+    Returns a list of (payment, old_amount, new_amount).
+    """
+    today = today or date.today()
+    with transaction.atomic():
+        candidates = payments_crossing_cutoff(today) if queryset is None else queryset
+        if not dry_run:
+            candidates = candidates.select_for_update(of=("self",))
+        changes = _late_penalty_changes(list(candidates), today)
+
+        if changes and not dry_run:
+            Payment.objects.bulk_update(
+                [payment for payment, _, _ in changes],
+                ["amount_due", "priced_on", "updated_at"],
+                batch_size=500,
+            )
+            refresh_households({payment.enrollment.student.household_id for payment, _, _ in changes}, today)
+            notify_students(payment.enrollment.student_id for payment, _, _ in changes)
+
+    logger.info("repriced %d payment(s), total delta %+d%s",
+                len(changes), sum(new - old for _, old, new in changes),
+                " (dry run)" if dry_run else "")
+    return changes
+
+
+def _late_penalty_changes(payments, today: date):
+    """Set the late price on *payments* in memory; (payment, old, new) for each."""
+    if not payments:
+        return []
+
+    plans = {
+        (plan.option_id, plan.cycle): plan
+        for plan in PricePlan.objects.filter(
+            option_id__in={p.enrollment.option_id for p in payments}
+        )
+    }
+
+    now = timezone.now()
+    changes = []
+    for payment in payments:
+        plan = plans.get((payment.enrollment.option_id, payment.cycle))
+        if plan is None:
+            logger.warning("payment %s: no price plan for option %s/%s",
+                           payment.pk, payment.enrollment.option_id, payment.cycle)
+            continue
+
+        family = payment.family_priced
+        delta = (
+            payment._price(plan, is_late=True, credit=0, family=family)
+            - payment._price(plan, is_late=False, credit=0, family=family)
+        )
+        old = payment.amount_due
+        payment.amount_due = old + delta
+        payment.priced_on  = today
+        payment.updated_at = now       # bulk_update skips auto_now
+        changes.append((payment, old, payment.amount_due))
+        logger.info("payment %s (student %s): %s -> %s (%+d)",
+                    payment.pk, payment.enrollment.student_id, old, payment.amount_due, delta)
+    return changes
+
+
+def reprice_family_discounts(household_ids, today: date | None = None, *, dry_run: bool = False):
+    """
+    Bring this month's unpaid payments of the given households in line with
+    their current family-discount eligibility (a sibling joined or left, or
+    is_family_member changed).  One query for the payments, one for the price
+    plans and one bulk UPDATE, whatever the household size.  As in
+    reprice_late_payments only the delta is applied, so credit consumed when
+    a payment was first priced is preserved.
+
+    Returns a list of (payment, old_amount, new_amount).
+    """
+    today = today or date.today()
+    ids = {pk for pk in household_ids if pk is not None}
+    if not ids:
+        return []
+
+    candidates = (
+        Payment.objects
+        .filter(
+            enrollment__student__household__in=ids,
+            due_date__year=today.year,
+            due_date__month=today.month,
+        )
+        .filter(Q(amount_paid__isnull=True) | Q(amount_paid__lt=F("amount_due")))
+        .select_related("enrollment__student__household")
+    )
+    # locked from the read to the write, like reprice_late_payments
+    with transaction.atomic():
+        if not dry_run:
+            candidates = candidates.select_for_update(of=("self",))
+        changes = _family_discount_changes(list(candidates), today)
+
+        if changes and not dry_run:
+            Payment.objects.bulk_update(
+                [payment for payment, _, _ in changes],
+                ["amount_due", "family_priced", "updated_at"],
+                batch_size=500,
+            )
+            refresh_households(ids, today)
+            notify_students(payment.enrollment.student_id for payment, _, _ in changes)
+
+    logger.info("family discount: repriced %d payment(s) in %d household(s), total delta %+d%s",
+                len(changes), len(ids), sum(new - old for _, old, new in changes),
+                " (dry run)" if dry_run else "")
+    return changes
+
+
+def _family_discount_changes(payments, today: date):
+    """Bring *payments* in line with the household discount in memory; (payment, old, new) for each."""
+    stale = [p for p in payments if p.family_priced != p.enrollment.student.has_family_discount]
+    if not stale:
+        return []
+
+    plans = {
+        (plan.option_id, plan.cycle): plan
+        for plan in PricePlan.objects.filter(option_id__in={p.enrollment.option_id for p in stale})
+    }
+
+    now = timezone.now()
+    changes = []
+    for payment in stale:
+        family = payment.enrollment.student.has_family_discount
+        plan = plans.get((payment.enrollment.option_id, payment.cycle))
+        if plan is None:
+            logger.warning("payment %s: no price plan for option %s/%s",
+                           payment.pk, payment.enrollment.option_id, payment.cycle)
+            continue
+
+        is_late = payment.is_late_on(payment.priced_on or today)
+        delta = (
+            payment._price(plan, is_late=is_late, credit=0, family=family)
+            - payment._price(plan, is_late=is_late, credit=0, family=payment.family_priced)
+        )
+        old = payment.amount_due
+        payment.amount_due    = max(old + delta, 0)
+        payment.family_priced = family
+        payment.updated_at    = now       # bulk_update skips auto_now
+        changes.append((payment, old, payment.amount_due))
+    return changes
@@ -1,10 +1,15 @@
 from datetime import date, timedelta
 from decimal import Decimal
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .models import Enrollment, Payment, PricePlan
+from .models import ClassOption, Enrollment, Payment, PricePlan, Student, Tombstone
+from .events import notify_students
+from .households import household_for, refresh_households
+from .services import reprice_family_discounts
+from .sync import SYNCED_MODELS
 
 @receiver(post_save, sender=Enrollment)
 def create_payments_for_enrollment(sender, instance, created, **kwargs):
@@ -25,4 +30,85 @@ def create_payments_for_enrollment(sender, instance, created, **kwargs):
         cycle = "M",
         due_date = due,
         method = "transfer",
-    )
\ No newline at end of file
+    )
+
+def record_tombstone(sender, instance, **kwargs):
+    if sender in SYNCED_MODELS.values():
+        Tombstone.objects.create(model=sender._meta.model_name, object_id=instance.pk)
+
+    # deleting a child changes what the parent row looks like to sync clients
+    now = timezone.now()
+    if sender is Enrollment:
+        Student.objects.filter(pk=instance.student_id).update(updated_at=now)
+    elif sender is Payment:
+        Student.objects.filter(enrollments=instance.enrollment_id).update(updated_at=now)
+    elif sender is PricePlan:
+        ClassOption.objects.filter(pk=instance.option_id).update(updated_at=now)
+
+# one sender at a time: a post_delete listener on any other model (sessions,
+# the credit ledger, reminder logs) would turn off Django's fast delete there
+for model in (*SYNCED_MODELS.values(), PricePlan):
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f"record_tombstone_{model._meta.label_lower}")
+
+# ─── households ──────────────────────────────────────────────────────────────
+
+PRICING_FIELDS = {"cuil", "is_family_member"}
+
+@receiver(post_save, sender=Student)
+def assign_household(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not PRICING_FIELDS & set(update_fields):
+        # e.g. a credit change: only the rollup moves
+        refresh_households([instance.household_id])
+        return
+
+    previous  = instance.household_id
+    household = household_for(instance.cuil)
+    current   = household.pk if household is not None else None
+    if previous != current:
+        Student.objects.filter(pk=instance.pk).update(household=household)
+
+    # sizes first: eligibility for the family discount depends on them
+    affected = [previous, current]
+    refresh_households(affected)
+    if household is not None:
+        household.refresh_from_db()
+    instance.household = household
+    reprice_family_discounts(affected)
+
+@receiver(post_delete, sender=Student)
+def leave_household(sender, instance, **kwargs):
+    refresh_households([instance.household_id])
+    reprice_family_discounts([instance.household_id])
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_household_rollup(sender, instance, **kwargs):
+    refresh_households(
+        Student.objects.filter(enrollments=instance.enrollment_id).values_list("household_id", flat=True)
+    )
+
+# ─── live finance updates (SSE) ──────────────────────────────────────────────
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_save, sender=Payment)
+def push_student_update(sender, instance, **kwargs):
+    if sender is Student:
+        notify_students([instance.pk])
+    elif sender is Enrollment:
+        notify_students([instance.student_id])
+    else:
+        notify_students([instance.enrollment.student_id])
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=Payment)
+def push_student_delete(sender, instance, **kwargs):
+    if sender is Student:
+        notify_students([instance.pk], deleted=True)
+    elif sender is Enrollment:
+        notify_students([instance.student_id])
+    else:
+        notify_students(
+            Enrollment.objects.filter(pk=instance.enrollment_id).values_list("student_id", flat=True)
+        )
@@ -0,0 +1,152 @@
+# core/sync.py
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CUTOFF_DAY, Class, ClassOption, Enrollment, Payment, PricePlan, Student, Tombstone
+from .querysets import class_options_with_prices, student_with_finance
+from .serializers import (
+    ClassOptionSerializer,
+    ClassSerializer,
+    EnrollmentSerializer,
+    PaymentSerializer,
+    StudentSerializer,
+)
+
+# rows committed slightly after the token was issued still carry an earlier
+# updated_at; re-send that window so clients never miss them (merge is by id)
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# payload key → model whose deletions are reported as tombstones
+SYNCED_MODELS = {
+    "students":      Student,
+    "classes":       Class,
+    "class_options": ClassOption,
+    "enrollments":   Enrollment,
+    "payments":      Payment,
+}
+
+
+# tables with columns computed from today's date (amount_due / debt / is_late
+# of students, is_late of payments): no updated_at moves when the month rolls
+# over or the cutoff passes, so they are re-sent whole when that happens
+DATED_TABLES = ("students", "payments")
+
+
+def pricing_period(today: date) -> str:
+    """Stretch of time in which the dated columns can't change by themselves."""
+    return f"{today:%Y-%m}-{'late' if today.day > CUTOFF_DAY else 'on-time'}"
+
+
+def make_token(issued: datetime, today: date) -> str:
+    return f"{issued.isoformat()}~{pricing_period(today)}"
+
+
+def parse_token(token: str) -> tuple[datetime, str | None] | None:
+    """(issued, pricing period) of a token; the period is None for old tokens."""
+    stamp, _, period = token.partition("~")
+    since = parse_datetime(stamp)
+    if since is None:
+        return None
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since, period or None
+
+
+def changed_since(since: datetime | None, today: date | None = None, *, dated_since: datetime | None = None) -> dict:
+    """
+    Querysets with the rows that changed after *since* (everything when None).
+    The DATED_TABLES use *dated_since* instead, so they can be sent whole
+    while the rest stays incremental.
+
+    Rows carrying columns copied from another table are re-sent when that
+    row changed: a student's finance columns and class names follow its
+    enrollments, payments and classes; student_dni and class / course names
+    on enrollments and payments follow the student and the class.
+    """
+    students      = student_with_finance(today)
+    classes       = Class.objects.all()
+    class_options = class_options_with_prices()
+    enrollments   = Enrollment.objects.select_related("student", "option__klass")
+    payments      = Payment.objects.select_related("enrollment__student", "enrollment__option__klass")
+
+    if dated_since is not None:
+        renamed = Enrollment.objects.filter(
+            Q(option__updated_at__gte=dated_since) | Q(option__klass__updated_at__gte=dated_since)
+        )
+        students = students.filter(
+            Q(updated_at__gte=dated_since)
+            | Q(pk__in=Enrollment.objects.filter(updated_at__gte=dated_since).values("student_id"))
+            | Q(pk__in=Payment.objects.filter(updated_at__gte=dated_since).values("enrollment__student_id"))
+            | Q(pk__in=renamed.values("student_id"))
+        )
+        payments = payments.filter(
+            Q(updated_at__gte=dated_since)
+            | Q(enrollment__updated_at__gte=dated_since)
+            | Q(enrollment__student__updated_at__gte=dated_since)
+            | Q(enrollment__in=renamed)
+        )
+
+    if since is not None:
+        classes       = classes.filter(updated_at__gte=since)
+        class_options = class_options.filter(
+            Q(updated_at__gte=since)
+            | Q(klass__updated_at__gte=since)
+            | Q(pk__in=PricePlan.objects.filter(updated_at__gte=since).values("option_id"))
+        )
+        enrollments   = enrollments.filter(
+            Q(updated_at__gte=since)
+            | Q(student__updated_at__gte=since)
+            | Q(option__updated_at__gte=since)
+            | Q(option__klass__updated_at__gte=since)
+        )
+
+    return {
+        "students":      students.order_by("pk"),
+        "classes":       classes.order_by("pk"),
+        "class_options": class_options.order_by("pk"),
+        "enrollments":   enrollments.order_by("pk"),
+        "payments":      payments.order_by("pk"),
+    }
+
+
+def sync_payload(since: datetime | None, period: str | None = None, today: date | None = None) -> dict:
+    """
+    Rows changed since the token.  When the token was issued in another
+    pricing period (or has none), the DATED_TABLES come back whole and are
+    listed in `reset`: clients drop their copy before merging.
+    """
+    today = today or date.today()
+    token = timezone.now()
+    if since is not None:
+        since -= SYNC_OVERLAP
+
+    dated_stale = since is not None and period != pricing_period(today)
+    dated_since = None if dated_stale else since
+
+    changed = changed_since(since, today, dated_since=dated_since)
+    payload = {
+        "token":         make_token(token, today),
+        "full":          since is None,
+        "reset":         list(DATED_TABLES) if dated_stale else [],
+        "students":      StudentSerializer(changed["students"], many=True).data,
+        "classes":       ClassSerializer(changed["classes"], many=True).data,
+        "class_options": ClassOptionSerializer(changed["class_options"], many=True).data,
+        "enrollments":   EnrollmentSerializer(changed["enrollments"], many=True).data,
+        "payments":      PaymentSerializer(changed["payments"], many=True).data,
+        "deleted":       {key: [] for key in SYNCED_MODELS},
+    }
+
+    if since is not None:
+        keys = {model._meta.model_name: key for key, model in SYNCED_MODELS.items()}
+        for model_name, object_id in (
+            Tombstone.objects
+            .filter(deleted_at__gte=since)
+            .values_list("model", "object_id")
+        ):
+            if model_name in keys and keys[model_name] not in payload["reset"]:
+                payload["deleted"][keys[model_name]].append(object_id)
+
+    return payload
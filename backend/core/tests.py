@@ -1,3 +1,696 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from datetime import date, timedelta
+from importlib import import_module
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import Permission, User
+from django.contrib.sessions.models import Session
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from config.urls import router
+
+from .models import (
+    CUTOFF_DAY, PLACEHOLDER_CUIL, Class, ClassOption, CreditMovement, CreditSnapshot, Enrollment, Household, Payment, PricePlan,
+    ReminderLog, Student, Tombstone,
+)
+from .credit import balance_at, take_snapshots
+from .events import _rows
+from .households import households_with_dues
+from .profiling import _LazyCapture
+from .querysets import finance_summary, student_with_finance
+from .services import payments_crossing_cutoff, reprice_family_discounts, reprice_late_payments
+from .sync import SYNCED_MODELS, changed_since, make_token, parse_token, pricing_period, sync_payload
+
+
+# Queries allowed per request for every endpoint registered in config/urls.py.
+# The count must also stay the same when the tables grow (no N+1).
+QUERY_BUDGET = {
+    # basename:        (list, detail)
+    "students":        (1, 1),
+    "classes":         (1, 1),
+    "class-options":   (1, 1),
+    "enrollments":     (1, 1),
+    "payments":        (1, 1),
+    "payments-simple": (1, 1),
+    "households":      (1, 1),
+    "sync":            (5, None),
+}
+
+# Tables that grow with the school; plans must reach them through an index.
+LARGE_TABLES = {"core_household", "core_student", "core_enrollment", "core_payment", "core_creditmovement"}
+
+
+def seed(count: int, offset: int = 0):
+    klass, _ = Class.objects.get_or_create(name="Judo")
+    option, created = ClassOption.objects.get_or_create(
+        klass=klass, weekly_sessions=2, defaults={"identifier": "J2"}
+    )
+    if created:
+        PricePlan.objects.create(option=option, cycle="M", base_price=10000)
+        PricePlan.objects.create(option=option, cycle="S", base_price=50000)
+
+    today = date.today()
+    for i in range(offset, offset + count):
+        student = Student.objects.create(
+            DNI=str(30_000_000 + i), first_name=f"Nombre{i}", last_name=f"Apellido{i}",
+            birth_date=date(2010 + i % 10, 1, 1), cuil=str(20_300_000_000 + i),
+        )
+        # the post_save signal creates this month's payment
+        Enrollment.objects.create(student=student, option=option, start=today.replace(day=1 + i % 28))
+        if i % 2:
+            payment = Payment.objects.filter(enrollment__student=student).get()
+            payment.amount_paid = payment.amount_due + 500
+            payment.paid_on = today
+            payment.save()
+
+
+def seq_scans(plan: dict) -> set[str]:
+    found = set()
+    if plan.get("Node Type") == "Seq Scan":
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found |= seq_scans(child)
+    return found
+
+
+class EndpointQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME="localhost")
+
+    def count_queries(self, url) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"format": "json"})
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def measure(self):
+        counts = {}
+        for _, viewset, basename in router.registry:
+            counts[(basename, "list")] = self.count_queries(reverse(f"{basename}-list"))
+            if hasattr(viewset, "retrieve"):
+                model = viewset.serializer_class.Meta.model
+                pk = model.objects.order_by("pk").values_list("pk", flat=True).first()
+                counts[(basename, "detail")] = self.count_queries(reverse(f"{basename}-detail", args=[pk]))
+        return counts
+
+    def test_every_endpoint_has_a_budget(self):
+        registered = {basename for _, _, basename in router.registry}
+        self.assertEqual(registered - set(QUERY_BUDGET), set(), "add the new endpoint to QUERY_BUDGET")
+
+    def test_query_count_within_budget_and_flat(self):
+        seed(3)
+        small = self.measure()
+        seed(30, offset=3)
+        large = self.measure()
+
+        for (basename, kind), count in large.items():
+            with self.subTest(endpoint=basename, kind=kind):
+                budget = QUERY_BUDGET[basename][0 if kind == "list" else 1]
+                self.assertLessEqual(count, budget)
+                self.assertEqual(count, small[(basename, kind)], "query count grows with rows")
+
+
+class AsyncEndpointTests(TestCase):
+    """The /api/async/ views must return what the sync endpoints return."""
+
+    PAIRS = {
+        "async-students":        reverse_lazy("students-list"),
+        "async-payments":        reverse_lazy("payments-list"),
+        "async-payments-simple": reverse_lazy("payments-simple-list"),
+        "async-class-options":   reverse_lazy("class-options-list"),
+        "async-summary":         reverse_lazy("summary"),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(5)
+        karate = Class.objects.create(name="Karate")
+        option = ClassOption.objects.create(klass=karate, weekly_sessions=3, identifier="K3")
+        PricePlan.objects.create(option=option, cycle="M", base_price=12000)
+        # enrolled on two different start days: one row per student in the summary all the same
+        student = Student.objects.first()
+        Enrollment.objects.create(student=student, option=option, start=date.today().replace(day=15))
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME="localhost")
+
+    def test_same_rows_as_sync_endpoints(self):
+        for name, sync_url in self.PAIRS.items():
+            with self.subTest(endpoint=name):
+                expected = self.client.get(sync_url, {"format": "json"})
+                actual   = self.client.get(reverse(name))
+                self.assertEqual(actual.status_code, 200)
+                self.assertEqual(actual.json(), expected.json())
+
+    def test_filters_match_sync_endpoints(self):
+        klass = Class.objects.get(name="Karate").pk
+        cases = [
+            ("async-class-options", "class-options-list", {"klass": klass}),
+            ("async-class-options", "class-options-list", {"weekly_sessions": 2}),
+            ("async-payments", "payments-list", {"enrollment__student__DNI": "30000001"}),
+        ]
+        for name, sync_name, params in cases:
+            with self.subTest(endpoint=name, params=params):
+                expected = self.client.get(reverse(sync_name), {**params, "format": "json"}).json()
+                actual   = self.client.get(reverse(name), params).json()
+                self.assertEqual(actual, expected)
+                self.assertLess(len(actual), len(self.client.get(reverse(name)).json()))
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get(reverse("async-payments"), {"due_date": "nope"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("due_date", response.json())
+        response = self.client.get(reverse("async-class-options"), {"klass": 999999})
+        self.assertEqual(response.status_code, 400)
+
+    def test_summary_counts_each_student_once(self):
+        today = date.today().replace(day=20)
+        queryset, aggregates = finance_summary(today)
+
+        expected = {"students": 0, "total_due": 0, "total_paid": 0, "total_debt": 0, "paid": 0, "late": 0}
+        for student in Student.objects.filter(active=True):
+            payments = Payment.objects.filter(
+                enrollment__student=student, due_date__year=today.year, due_date__month=today.month,
+            )
+            due  = sum(p.amount_due for p in payments)
+            paid = sum(p.amount_paid or 0 for p in payments)
+            debt = due - paid - student.credit_balance
+            joined_by_cutoff = student.enrollments.filter(start__day__lte=CUTOFF_DAY).exists()
+            expected["students"]   += 1
+            expected["total_due"]  += due
+            expected["total_paid"] += paid
+            expected["total_debt"] += max(debt, 0)
+            expected["paid"]       += debt <= 0
+            expected["late"]       += debt > 0 and joined_by_cutoff
+
+        self.assertEqual(queryset.aggregate(**aggregates), expected)
+
+
+class FastListParityTests(TestCase):
+    """The fast list path must render exactly what the serializers render (?fast=0)."""
+
+    ENDPOINTS = ("students-list", "payments-list", "payments-simple-list")
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(4)         # minors; unpaid and joined by the cutoff (late) or paid with credit
+        adult = Student.objects.create(
+            DNI="25000000", first_name="Adulto", last_name="Tarde", birth_date=date(1990, 5, 1),
+            cuil="20250000003",
+        )
+        Enrollment.objects.create(
+            student=adult, option=ClassOption.objects.get(), start=date.today().replace(day=15),
+        )
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME="localhost")
+
+    def on_day(self, day):
+        """Pretend the request runs on *day* of this month (serializers and SQL alike)."""
+        today = date.today().replace(day=day)
+
+        class Today(date):
+            @classmethod
+            def today(cls):
+                return today
+
+        now = timezone.now().replace(day=day)
+        for target in ("core.fastlist.date", "core.models.date", "core.querysets.date", "core.views.date"):
+            patcher = mock.patch(target, Today)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("django.utils.timezone.now", return_value=now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_same_rows(self):
+        for name in self.ENDPOINTS:
+            with self.subTest(endpoint=name):
+                fast = self.client.get(reverse(name), {"format": "json"}).json()
+                slow = self.client.get(reverse(name), {"format": "json", "fast": "0"}).json()
+                self.assertEqual(len(fast), Payment.objects.count() if "payments" in name else Student.objects.count())
+                self.assertEqual(fast, slow)
+
+    def test_after_the_cutoff(self):
+        self.on_day(20)
+        self.assert_same_rows()
+
+        payments = self.client.get(reverse("payments-list"), {"format": "json"}).json()
+        self.assertIn(True, [row["is_late"] for row in payments])
+        self.assertIn(False, [row["is_late"] for row in payments if not row["is_paid"]])
+        cuils = {row["DNI"]: row["display_cuil"] for row in self.client.get(reverse("students-list")).json()}
+        self.assertEqual(cuils["25000000"], "20250000003")
+        self.assertEqual(cuils["30000000"], "20300000000 (padre/madre)")
+
+    def test_before_the_cutoff(self):
+        self.on_day(5)
+        self.assert_same_rows()
+
+
+class TombstoneTests(TestCase):
+    def test_only_synced_models_have_delete_listeners(self):
+        for model in (CreditMovement, CreditSnapshot, ReminderLog, Tombstone, Session, Permission):
+            with self.subTest(model=model.__name__):
+                self.assertFalse(post_delete.has_listeners(model))
+        for model in (*SYNCED_MODELS.values(), PricePlan):
+            with self.subTest(model=model.__name__):
+                self.assertTrue(post_delete.has_listeners(model))
+
+    def test_deleting_a_class_leaves_a_tombstone(self):
+        klass = Class.objects.create(name="Esgrima")
+        pk = klass.pk
+        klass.delete()
+        self.assertTrue(Tombstone.objects.filter(model="class", object_id=pk).exists())
+
+
+class SyncTokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(4)
+        # past the SYNC_OVERLAP window, so nothing counts as changed
+        cls.issued = timezone.now() + timedelta(minutes=1)
+
+    def payload(self, token_day: int, today_day: int) -> dict:
+        month = date.today().replace(day=1)
+        since, period = parse_token(make_token(self.issued, month.replace(day=token_day)))
+        return sync_payload(since, period, today=month.replace(day=today_day))
+
+    def test_same_pricing_period_stays_incremental(self):
+        payload = self.payload(token_day=12, today_day=20)
+        self.assertEqual(payload["reset"], [])
+        self.assertEqual(payload["students"], [])
+
+    def test_token_from_before_the_cutoff_resends_dated_tables(self):
+        payload = self.payload(token_day=5, today_day=20)
+        self.assertFalse(payload["full"])
+        self.assertEqual(payload["reset"], ["students", "payments"])
+        self.assertEqual(len(payload["students"]), Student.objects.count())
+        self.assertEqual(len(payload["payments"]), Payment.objects.count())
+        self.assertEqual(payload["enrollments"], [])
+        # the resent rows are priced for today: unpaid students joined by the 10th are late
+        self.assertTrue(any(row["is_late"] for row in payload["students"]))
+
+    def test_token_without_period_resends_dated_tables(self):
+        since, period = parse_token(self.issued.isoformat())
+        self.assertIsNone(period)
+        self.assertEqual(sync_payload(since, period)["reset"], ["students", "payments"])
+
+
+class SyncChangesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(4)
+        # a second class on the other side of the cutoff for the first student
+        karate = ClassOption.objects.create(
+            klass=Class.objects.create(name="Karate"), weekly_sessions=3, identifier="K3",
+        )
+        PricePlan.objects.create(option=karate, cycle="M", base_price=7000)
+        cls.student = Student.objects.get(DNI="30000000")
+        Enrollment.objects.create(student=cls.student, option=karate, start=date.today().replace(day=15))
+
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        for model in (*SYNCED_MODELS.values(), PricePlan):
+            model.objects.update(updated_at=an_hour_ago)
+        cls.since = an_hour_ago + timedelta(minutes=30)
+
+    def payload(self) -> dict:
+        today = date.today()
+        return sync_payload(self.since, pricing_period(today), today)
+
+    def test_full_sync_has_one_row_per_student(self):
+        students = sync_payload(None)["students"]
+        self.assertEqual(len(students), Student.objects.count())
+        row = next(row for row in students if row["id"] == self.student.pk)
+        self.assertEqual(row["enrolled_classes"], ["Judo", "Karate"])
+        owed = sum(Payment.objects.filter(enrollment__student=self.student).values_list("amount_due", flat=True))
+        self.assertEqual(row["amount_due"], owed)
+
+    def test_nothing_changed(self):
+        payload = self.payload()
+        self.assertEqual([payload[key] for key in SYNCED_MODELS], [[]] * len(SYNCED_MODELS))
+
+    def test_dni_edit_resends_the_rows_that_copy_it(self):
+        self.student.DNI = "39999999"
+        self.student.save()
+        payload = self.payload()
+
+        self.assertEqual([row["id"] for row in payload["students"]], [self.student.pk])
+        for key in ("enrollments", "payments"):
+            with self.subTest(table=key):
+                self.assertEqual(len(payload[key]), 2)
+                self.assertEqual({row["student_dni"] for row in payload[key]}, {"39999999"})
+
+    def test_class_rename_resends_the_rows_that_copy_it(self):
+        judo = Class.objects.get(name="Judo")
+        judo.name = "Judo infantil"
+        judo.save()
+        payload = self.payload()
+
+        judo_students = Student.objects.filter(enrollments__option__klass=judo).distinct().count()
+        judo_rows = Enrollment.objects.filter(option__klass=judo).count()
+        self.assertEqual(len(payload["students"]), judo_students)
+        self.assertIn("Judo infantil", payload["students"][0]["enrolled_classes"])
+        self.assertEqual(
+            {row["course_name"] for row in payload["enrollments"]}, {"Judo infantil"},
+        )
+        self.assertEqual(len(payload["enrollments"]), judo_rows)
+        self.assertEqual({row["class_name"] for row in payload["payments"]}, {"Judo infantil"})
+        self.assertEqual(len(payload["class_options"]), 1)
+
+
+class HouseholdTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(1)
+        cls.option = ClassOption.objects.get()
+
+    def enroll(self, dni, cuil, **extra):
+        student = Student.objects.create(
+            DNI=dni, first_name="Hijo", last_name=dni, birth_date=date(2015, 1, 1), cuil=cuil, **extra,
+        )
+        Enrollment.objects.create(student=student, option=self.option, start=date.today().replace(day=1))
+        return student
+
+    def test_sibling_alone_does_not_grant_the_discount_by_default(self):
+        first = self.enroll("40000011", "27333333334")
+        full_price = Payment.objects.get(enrollment__student=first).amount_due
+        second = self.enroll("40000012", "27333333334")
+
+        self.assertEqual(Household.objects.get(cuil="27333333334").size, 2)
+        for student in (first, second):
+            payment = Payment.objects.get(enrollment__student=student)
+            self.assertEqual(payment.amount_due, full_price)
+            self.assertFalse(payment.family_priced)
+
+    def test_family_flag_reprices_the_month(self):
+        student = self.enroll("40000013", "27444444445")
+        payment = Payment.objects.get(enrollment__student=student)
+        full_price = payment.amount_due
+
+        student.is_family_member = True
+        student.save()
+
+        payment.refresh_from_db()
+        self.assertLess(payment.amount_due, full_price)
+        self.assertTrue(payment.family_priced)
+
+    def test_family_reprice_locks_the_payments(self):
+        student = self.enroll("40000016", "27444444446")
+        Student.objects.filter(pk=student.pk).update(is_family_member=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            changes = reprice_family_discounts([student.household_id])
+
+        self.assertEqual(len(changes), 1)
+        select = next(q["sql"] for q in ctx.captured_queries if q["sql"].startswith('SELECT "core_payment"'))
+        self.assertIn('FOR UPDATE OF "core_payment"', select)
+
+    @override_settings(HOUSEHOLD_FAMILY_DISCOUNT=True)
+    def test_placeholder_cuil_is_not_a_household(self):
+        first  = self.enroll("40000014", PLACEHOLDER_CUIL)
+        second = self.enroll("40000015", PLACEHOLDER_CUIL)
+        self.enroll("40000016", "123")
+
+        self.assertIsNone(first.household)
+        self.assertIsNone(second.household)
+        self.assertFalse(Household.objects.filter(cuil__in=[PLACEHOLDER_CUIL, "123"]).exists())
+        self.assertFalse(Payment.objects.get(enrollment__student=second).family_priced)
+
+    @override_settings(HOUSEHOLD_FAMILY_DISCOUNT=True)
+    def test_sibling_joining_applies_family_discount_to_the_household(self):
+        first = self.enroll("40000001", "27111111112")
+        payment = Payment.objects.get(enrollment__student=first)
+        full_price = payment.amount_due
+
+        second = self.enroll("40000002", "27111111112")
+
+        household = Household.objects.get(cuil="27111111112")
+        self.assertEqual(first.household_id, household.pk)
+        self.assertEqual(second.household_id, household.pk)
+        self.assertEqual(household.size, 2)
+
+        payment.refresh_from_db()
+        sibling_payment = Payment.objects.get(enrollment__student=second)
+        self.assertLess(payment.amount_due, full_price)
+        self.assertTrue(payment.family_priced)
+        self.assertEqual(sibling_payment.amount_due, payment.amount_due)
+        self.assertEqual(household.debt, payment.amount_due + sibling_payment.amount_due)
+
+    def test_rollup_follows_posted_payments(self):
+        student = self.enroll("40000003", "27222222223")
+        payment = Payment.objects.get(enrollment__student=student)
+        payment.amount_paid = payment.amount_due + 700
+        payment.paid_on = date.today()
+        payment.save()
+
+        household = Household.objects.get(cuil="27222222223")
+        self.assertEqual((household.debt, household.credit), (0, 700))
+
+
+class CreditLedgerTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            DNI="40000000", first_name="Ana", last_name="Credito", birth_date=date(2014, 1, 1),
+            cuil=PLACEHOLDER_CUIL,
+        )
+        self.t0 = timezone.now() - timedelta(days=30)
+
+    def move(self, balance, days):
+        """Set the balance and date the new ledger movement *days* after t0."""
+        self.student.set_credit_balance(balance, reason="adjustment")
+        movement = self.student.credit_movements.latest("pk")
+        CreditMovement.objects.filter(pk=movement.pk).update(created_at=self.t0 + timedelta(days=days))
+        return movement
+
+    def test_balance_at_is_snapshot_plus_tail(self):
+        self.move(1000, days=1)
+        self.move(1500, days=2)
+        take_snapshots(self.t0 + timedelta(days=3))
+        self.move(700, days=4)
+
+        self.assertEqual(balance_at(self.student.pk, self.t0), 0)
+        self.assertEqual(balance_at(self.student.pk, self.t0 + timedelta(days=1)), 1000)
+        self.assertEqual(balance_at(self.student.pk, self.t0 + timedelta(days=3)), 1500)
+        self.assertEqual(balance_at(self.student.pk), 700)
+
+        # the snapshot, not the movements it covers, is what gets read
+        CreditSnapshot.objects.update(balance=F("balance") + 1)
+        self.assertEqual(balance_at(self.student.pk, self.t0 + timedelta(days=3)), 1501)
+        self.assertEqual(balance_at(self.student.pk), 701)
+
+    def test_snapshots_build_on_the_previous_one(self):
+        self.move(1000, days=1)
+        self.assertEqual(take_snapshots(self.t0 + timedelta(days=2)), 1)
+        self.assertEqual(take_snapshots(self.t0 + timedelta(days=3)), 0)
+
+        CreditSnapshot.objects.update(balance=F("balance") + 1)
+        last = self.move(400, days=4)
+        self.assertEqual(take_snapshots(), 1)
+
+        snapshot = CreditSnapshot.objects.latest("taken_at")
+        self.assertEqual((snapshot.balance, snapshot.last_movement_id), (401, last.pk))
+
+    def test_verify_fails_on_a_stale_credit_balance(self):
+        self.move(1000, days=1)
+        out = io.StringIO()
+        call_command("credit_snapshots", "--verify", stdout=out)
+        self.assertIn("matches the ledger", out.getvalue())
+
+        Student.objects.filter(pk=self.student.pk).update(credit_balance=1200)
+        err = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "1 student(s) out of sync"):
+            call_command("credit_snapshots", "--verify", stdout=io.StringIO(), stderr=err)
+        self.assertIn("40000000", err.getvalue())
+        self.assertIn("credit_balance=1200 ledger=1000", err.getvalue())
+
+
+class FinanceEventTests(TestCase):
+    def test_one_message_per_student_with_every_enrollment(self):
+        seed(1)
+        student = Student.objects.get()
+        karate = ClassOption.objects.create(
+            klass=Class.objects.create(name="Karate"), weekly_sessions=3, identifier="K3",
+        )
+        PricePlan.objects.create(option=karate, cycle="M", base_price=7000)
+        Enrollment.objects.create(student=student, option=karate, start=date.today().replace(day=15))
+        owed = sum(Payment.objects.filter(enrollment__student=student).values_list("amount_due", flat=True))
+
+        rows = _rows([student.pk], deleted=False)
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["amount_due"], owed)
+        self.assertEqual(rows[0]["debt"], owed - student.credit_balance)
+
+
+class RepricingTests(TestCase):
+    """The nightly late-penalty pass on a 15000 plan (prices round up to 1000)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        klass  = Class.objects.create(name="Karate")
+        option = ClassOption.objects.create(klass=klass, weekly_sessions=3, identifier="K3")
+        PricePlan.objects.create(option=option, cycle="M", base_price=15000)
+        month = date.today().replace(day=1)
+        cls.early, cls.late = month.replace(day=8), month.replace(day=20)
+
+        def priced_on_time(name, *, method, family=False, amount_due, start_day=3, amount_paid=None):
+            student = Student.objects.create(
+                DNI=name, first_name=name, last_name=name, birth_date=date(2015, 1, 1), cuil=PLACEHOLDER_CUIL,
+            )
+            Enrollment.objects.create(student=student, option=option, start=month.replace(day=start_day))
+            # as saved on the 5th, whatever day the suite runs
+            Payment.objects.filter(enrollment__student=student).update(
+                method=method, family_priced=family, amount_due=amount_due,
+                amount_paid=amount_paid, priced_on=month.replace(day=5),
+            )
+            return Payment.objects.get(enrollment__student=student)
+
+        cls.cash     = priced_on_time("cash", method="cash", amount_due=14000)                 # 13500 -> 14000
+        cls.transfer = priced_on_time("transfer", method="transfer", amount_due=15000)
+        cls.family   = priced_on_time("family", method="transfer", family=True, amount_due=14000)
+        cls.credited = priced_on_time("credited", method="cash", amount_due=11000)             # 2500 credit used
+        cls.joined_late = priced_on_time("joined-late", method="cash", amount_due=14000, start_day=15)
+        cls.settled = priced_on_time("settled", method="cash", amount_due=14000, amount_paid=14000)
+
+    def test_nothing_to_reprice_before_the_cutoff(self):
+        self.assertEqual(reprice_late_payments(self.early), [])
+
+    def test_adds_the_late_minus_on_time_delta(self):
+        changes = reprice_late_payments(self.late)
+
+        self.assertEqual(
+            {payment.pk: (old, new) for payment, old, new in changes},
+            {
+                self.cash.pk:     (14000, 17000),     # 16500 -> 17000, cash discount lost
+                self.transfer.pk: (15000, 17000),
+                self.family.pk:   (14000, 15000),     # 16500 - 10 % family -> 15000
+                self.credited.pk: (11000, 14000),     # same delta as cash, credit kept
+            },
+        )
+        self.assertEqual(Payment.objects.get(pk=self.family.pk).amount_due, 15000)
+        self.assertEqual(Payment.objects.get(pk=self.cash.pk).priced_on, self.late)
+        self.assertEqual(reprice_late_payments(self.late), [])
+
+    def test_dry_run_writes_nothing(self):
+        self.assertEqual(len(reprice_late_payments(self.late, dry_run=True)), 4)
+        self.assertEqual(Payment.objects.get(pk=self.cash.pk).amount_due, 14000)
+
+    def test_candidates_are_locked_until_written(self):
+        for dry_run, locked in ((True, False), (False, True)):
+            with self.subTest(dry_run=dry_run), CaptureQueriesContext(connection) as ctx:
+                reprice_late_payments(self.late, dry_run=dry_run)
+            select = next(q["sql"] for q in ctx.captured_queries if '"core_payment"."priced_on" BETWEEN' in q["sql"])
+            self.assertEqual('FOR UPDATE OF "core_payment"' in select, locked)
+
+    def test_backfill_makes_legacy_payments_candidates(self):
+        backfill = import_module("core.migrations.0014_backfill_payment_priced_on").backfill_priced_on
+        Payment.objects.update(priced_on=None)
+
+        backfill(apps, None)
+
+        self.assertEqual(
+            Payment.objects.get(pk=self.cash.pk).priced_on, self.cash.enrollment.start,
+        )
+        self.assertEqual(
+            set(payments_crossing_cutoff(self.late).values_list("pk", flat=True)),
+            {self.cash.pk, self.transfer.pk, self.family.pk, self.credited.pk},
+        )
+
+
+class QueryPlanTests(TestCase):
+    """
+    Plans for the hot filtered querysets must not fall back to sequential
+    scans.  With enable_seqscan off the planner only picks a Seq Scan when no
+    usable index exists, so this catches missing indexes on tiny test tables.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(20)
+
+    def plan_of(self, queryset) -> dict:
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return json.loads(queryset.explain(format="json"))[0]["Plan"]
+
+    def assert_no_seq_scan(self, queryset):
+        scanned = seq_scans(self.plan_of(queryset)) & LARGE_TABLES
+        self.assertEqual(scanned, set(), f"sequential scan on {', '.join(sorted(scanned))}")
+
+    def test_student_finance_for_one_student(self):
+        self.assert_no_seq_scan(student_with_finance().filter(pk=Student.objects.first().pk))
+
+    def test_payments_by_student_dni(self):
+        self.assert_no_seq_scan(Payment.objects.filter(enrollment__student__DNI="30000001"))
+
+    def test_payments_of_a_period(self):
+        today = date.today()
+        self.assert_no_seq_scan(
+            Payment.objects.filter(due_date__year=today.year, due_date__month=today.month)
+        )
+
+    def test_payments_crossing_cutoff(self):
+        self.assert_no_seq_scan(payments_crossing_cutoff(date.today().replace(day=20)))
+
+    def test_sync_changes(self):
+        since = timezone.now() - timedelta(minutes=5)
+        self.assert_no_seq_scan(Payment.objects.filter(updated_at__gte=since))
+        self.assert_no_seq_scan(Enrollment.objects.filter(updated_at__gte=since))
+        for key, queryset in changed_since(since, dated_since=since).items():
+            with self.subTest(table=key):
+                self.assert_no_seq_scan(queryset)
+
+    def test_credit_history(self):
+        student = Student.objects.first()
+        self.assert_no_seq_scan(
+            CreditMovement.objects.filter(student=student, created_at__lte=timezone.now())
+        )
+
+    def test_household_dues(self):
+        cuil = Student.objects.first().cuil
+        self.assert_no_seq_scan(households_with_dues().filter(cuil=cuil))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        # a server that refuses connections, like a replica that is down
+        self.dead = DatabaseWrapper({**connection.settings_dict, "HOST": "127.0.0.1", "PORT": "1"}, alias="dead")
+        self.addCleanup(self.dead.close)
+
+    def test_capture_leaves_unused_aliases_closed(self):
+        with self.assertRaises(OperationalError):
+            with CaptureQueriesContext(self.dead):
+                pass
+        with _LazyCapture(self.dead) as capture:
+            pass
+        self.assertEqual(len(capture), 0)
+        self.assertIsNone(self.dead.connection)
+
+    def test_profiled_request_reports_its_sql(self):
+        seed(2)
+        staff = User.objects.create_user("perfil", password="x", is_staff=True)
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_login(staff)
+
+        with self.settings(PROFILE_DIR=self.profile_dir.name):
+            response = client.get(reverse("students-list"), {"format": "json", "profile": "1"})
+
+        self.assertEqual(response.status_code, 200)
+        report = Path(self.profile_dir.name, f"{response['X-Profile-Id']}.txt").read_text(encoding="utf-8")
+        self.assertIn('[default]  SELECT "core_student"', report)
 
-# Create your tests here.
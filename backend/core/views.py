@@ -1,15 +1,32 @@
+import asyncio
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
 from django.shortcuts import render
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet, ViewSet
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters import rest_framework as filters
 from django.db.models import F, Value, BooleanField, Case, When, Q
-from datetime import date
+from datetime import date, datetime
+
+from billing.receipts import receipt_data, receipt_file, receipt_filename, receipt_files, zip_stream
 
-from .serializers import StudentSerializer, StudentCreateSerializer, ClassOptionSerializer, ClassSerializer, EnrollmentSerializer, PaymentSerializer, PaymentListSerializer
-from .querysets import student_with_finance
-from .models import Class, ClassOption, Enrollment, Payment, Student
+from .serializers import StudentSerializer, StudentCreateSerializer, ClassOptionSerializer, ClassSerializer, EnrollmentSerializer, PaymentSerializer, PaymentListSerializer, HouseholdSerializer
+from .querysets import class_options_with_prices, finance_summary, student_with_finance
+from .sync import parse_token, sync_payload
+from .events import broadcaster
+from .replica import ReplicaReadMixin, read_from_replica
+from .fastlist import FastJSONRenderer, FastListMixin, display_cuil_expr, dumps, payment_is_late_expr, payment_is_paid_expr
+from .households import households_with_dues
+from .models import Class, ClassOption, Enrollment, Household, Payment, Student
 
 class StudentFilter(filters.FilterSet):
     is_paid  = filters.BooleanFilter(field_name='is_paid')
@@ -21,13 +38,25 @@ class StudentFilter(filters.FilterSet):
         model  = Student
         fields = ['active', 'DNI', 'is_paid', 'is_late', 'has_family']
 
-class StudentViewSet(ModelViewSet):
+class StudentViewSet(ReplicaReadMixin, FastListMixin, ModelViewSet):
     serializer_class = StudentSerializer
     permission_classes = []
     
     def get_queryset(self):
         return student_with_finance()
     
+    def get_fast_list_fields(self):
+        return {
+            'id': 'id', 'DNI': 'DNI', 'display_cuil': display_cuil_expr(),
+            'first_name': 'first_name', 'last_name': 'last_name', 'birth_date': 'birth_date',
+            'contact': 'contact', 'active': 'active',
+            'is_family_member': 'is_family_member', 'created_at': 'created_at',
+            'enrolled_classes': 'enrolled_classes', 'enrolled_count': 'enrolled_count',
+            'is_paid': 'is_paid', 'is_late': 'is_late', 'amount_due': 'amount_due', 'debt': 'debt',
+            'has_family': 'is_family_member', 'credit_balance': 'credit_balance',
+            'household': 'household_id',
+        }
+    
     def get_serializer_class(self):
         return (
             StudentCreateSerializer
@@ -51,10 +80,15 @@ class ClassViewSet(ModelViewSet):
     ordering_fields = ['name']
     ordering = ['name']
     
-class ClassOptionViewSet(ModelViewSet):
-    queryset = ClassOption.objects.select_related("klass")
+class ClassOptionViewSet(FastListMixin, ModelViewSet):
+    queryset = class_options_with_prices()
     serializer_class = ClassOptionSerializer
     permission_classes = []
+    fast_list_fields = {
+        'id': 'id', 'klass': 'klass_id', 'weekly_sessions': 'weekly_sessions',
+        'class_name': 'klass__name',
+        'monthly_price': 'monthly_price', 'biannual_price': 'biannual_price',
+    }
     
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['klass', 'weekly_sessions']
@@ -64,7 +98,7 @@ class ClassOptionViewSet(ModelViewSet):
     
 class EnrollmentViewSet(ModelViewSet):
     queryset = (
-        Enrollment.objects.select_related('student', 'option')
+        Enrollment.objects.select_related('student', 'option__klass')
         .order_by('start', 'student__last_name', 'student__first_name')
     )
     serializer_class = EnrollmentSerializer
@@ -89,10 +123,34 @@ class PaymentFilter(filters.FilterSet):
         fields = ['method', 'enrollment__student__DNI', 'due_date']
     ordering = ['start']
 
-class PaymentViewSet(ModelViewSet):
+class PDFRenderer(BaseRenderer):
+    """Lets clients ask for the binary receipt actions (errors still go out as JSON)."""
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+class ZipRenderer(PDFRenderer):
+    media_type = 'application/zip'
+    format = 'zip'
+
+class PaymentViewSet(ReplicaReadMixin, FastListMixin, ModelViewSet):
     permission_classes = []
     serializer_class = PaymentSerializer
     
+    def get_fast_list_fields(self):
+        return {
+            'id': 'id', 'enrollment': 'enrollment_id',
+            'student_dni': 'enrollment__student__DNI',
+            'class_name': 'enrollment__option__klass__name',
+            'due_date': 'due_date', 'paid_on': 'paid_on',
+            'amount_due': 'amount_due', 'amount_paid': 'amount_paid',
+            'is_paid': payment_is_paid_expr(), 'is_late': payment_is_late_expr(),
+        }
+    
     def get_queryset(self):
         today = date.today()
         return (
@@ -117,15 +175,62 @@ class PaymentViewSet(ModelViewSet):
             .order_by('due_date')
     )
     
+    @action(detail=True, renderer_classes=[FastJSONRenderer, PDFRenderer])
+    def receipt(self, request, pk=None):
+        data = receipt_data(self.get_object())
+        return FileResponse(
+            open(receipt_file(data), 'rb'),
+            content_type='application/pdf',
+            filename=receipt_filename(data),
+        )
+
+    @action(detail=False, url_path='receipts', renderer_classes=[FastJSONRenderer, ZipRenderer])
+    def receipts(self, request):
+        """GET /api/payments/receipts/?period=YYYY-MM → ZIP with every paid receipt of the month."""
+        period = request.query_params.get('period', '')
+        try:
+            month = datetime.strptime(period, '%Y-%m').date()
+        except ValueError:
+            raise ValidationError({'period': 'Formato esperado: YYYY-MM.'})
+
+        payments = (
+            Payment.objects
+            .select_related('enrollment__student', 'enrollment__option__klass')
+            .filter(
+                due_date__year=month.year,
+                due_date__month=month.month,
+                amount_paid__isnull=False,
+            )
+            .order_by('enrollment__student__last_name', 'id')
+        )
+        datas = [receipt_data(payment) for payment in payments]
+        paths = receipt_files(datas)
+
+        response = StreamingHttpResponse(
+            zip_stream((receipt_filename(data), path) for data, path in zip(datas, paths)),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = f'attachment; filename="recibos-{period}.zip"'
+        return response
+    
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = PaymentFilter
     search_fields = ['enrollment__student__first_name', 'enrollment__student__last_name', 'enrollment__student__DNI']
     ordering_fields = ['due_date', 'amount_due', 'amount_paid', 'is_paid', 'enrollment__student__DNI']
     ordering = ['due_date']
 
-class PaymentListViewSet(ReadOnlyModelViewSet):
+class PaymentListViewSet(ReplicaReadMixin, FastListMixin, ReadOnlyModelViewSet):
     serializer_class = PaymentListSerializer
     permission_classes = []         
+    fast_list_fields = {
+        'DNI': 'enrollment__student__DNI',
+        'cuil': 'enrollment__student__cuil',
+        'last_name': 'enrollment__student__last_name',
+        'first_name': 'enrollment__student__first_name',
+        'class_name': 'enrollment__option__klass__name',
+        'cycle': 'cycle', 'amount_paid': 'amount_paid',
+        'method': 'method', 'paid_on': 'paid_on',
+    }
 
     def get_queryset(self):
         return (
@@ -135,4 +240,112 @@ class PaymentListViewSet(ReadOnlyModelViewSet):
                 'enrollment__option__klass',
             )
             .order_by('-paid_on', '-id')
-        )
\ No newline at end of file
+        )
+
+class HouseholdFilter(filters.FilterSet):
+    member_dni = filters.CharFilter(method='filter_member_dni')
+
+    def filter_member_dni(self, qs, name, value):
+        return qs.filter(pk__in=Student.objects.filter(DNI=value).values('household_id'))
+
+    class Meta:
+        model  = Household
+        fields = ['cuil']
+
+class HouseholdViewSet(ReplicaReadMixin, ReadOnlyModelViewSet):
+    """
+    GET /api/households/?cuil=…|member_dni=… → households with the cached
+    debt / credit rollup and every member's dues for the month, one query.
+    """
+    serializer_class = HouseholdSerializer
+    permission_classes = []
+
+    def get_queryset(self):
+        return households_with_dues()
+
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = HouseholdFilter
+    ordering_fields = ['cuil', 'debt', 'size']
+    ordering = ['cuil']
+
+class SyncViewSet(ViewSet):
+    """
+    GET /api/sync/?since=<token> → every row changed since the token, plus the
+    ids deleted since then.  Omit `since` for a full snapshot; each response
+    carries the token to send next time.  Tables listed in `reset` come back
+    whole (their computed columns moved with the date).
+    """
+    permission_classes = []
+
+    def list(self, request):
+        token = request.query_params.get("since")
+        parsed = None
+        if token:
+            try:
+                parsed = parse_token(token)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValidationError({"since": "Token de sincronización inválido."})
+
+        since, period = parsed or (None, None)
+        return Response(sync_payload(since, period))
+
+SSE_HEARTBEAT = 15  # seconds; keeps proxies from closing idle streams
+
+async def student_events(request):
+    """
+    GET /api/events/ → text/event-stream of student finance diffs, e.g.
+    `event: students` / `data: [{"student": 3, "debt": 0, "is_paid": true, ...}]`.
+    Must be served by the ASGI application (config.asgi).
+    """
+    async def stream():
+        queue = broadcaster.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: students\ndata: {message}\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+def health(request):
+    """
+    GET /api/health/ → 200 while the primary database answers, 503 otherwise.
+    Other databases (the replica) are reported but don't fail the check,
+    reads fall back to the primary on their own.
+    """
+    databases = {}
+    for alias in settings.DATABASES:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            databases[alias] = "ok"
+        except DatabaseError as exc:
+            databases[alias] = f"error: {exc.__class__.__name__}"
+
+    healthy = databases["default"] == "ok"
+    return JsonResponse(
+        {"status": "ok" if healthy else "error", "databases": databases},
+        status=200 if healthy else 503,
+    )
+
+@require_safe
+def summary(request):
+    """
+    GET /api/summary/ → dashboard totals for the current month: active
+    students, total due / paid / debt and how many are paid or late.
+    The ASGI app serves the same at /api/async/summary/.
+    """
+    read_from_replica()
+    queryset, aggregates = finance_summary()
+    return HttpResponse(dumps(queryset.aggregate(**aggregates)), content_type="application/json")
@@ -0,0 +1,26 @@
+# backend/gunicorn.conf.py
+# Production serving profile; every knob can be overridden from the environment.
+#
+#   sync     one request per process (the old default)
+#   gthread  GUNICORN_THREADS requests per process, each thread keeps its own
+#            persistent DB connection (CONN_MAX_AGE)
+#
+# Mind Postgres' max_connections: workers × threads connections per container.
+import multiprocessing
+
+from decouple import config as env  # "config" is itself a gunicorn setting
+
+bind = env("GUNICORN_BIND", default="0.0.0.0:8000")
+workers = env("GUNICORN_WORKERS", default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+worker_class = env("GUNICORN_WORKER_CLASS", default="gthread")
+threads = env("GUNICORN_THREADS", default=4, cast=int)
+
+timeout = env("GUNICORN_TIMEOUT", default=30, cast=int)
+graceful_timeout = 30
+keepalive = env("GUNICORN_KEEPALIVE", default=5, cast=int)
+
+# recycle workers now and then so a leak can't grow forever
+max_requests = env("GUNICORN_MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = 100
+
+accesslog = env("GUNICORN_ACCESSLOG", default="-")
@@ -0,0 +1,90 @@
+/* src/lib/sync.ts
+ * Local cache kept up to date through /sync/?since=<token>.
+ * Only the rows changed since the last call travel over the wire, except for
+ * the tables listed in `reset` (debt / late flags moved with the date), which
+ * come back whole.
+ */
+import { api } from './api';
+import type { Student } from '../types/student';
+
+type Row = { id: number; [key: string]: unknown };
+
+const KEYS = ['students', 'classes', 'class_options', 'enrollments', 'payments'] as const;
+type Key = (typeof KEYS)[number];
+
+interface SyncResponse extends Record<Key, Row[]> {
+  token: string;
+  full: boolean;
+  reset: Key[];
+  deleted: Record<Key, number[]>;
+}
+
+interface Cache {
+  token: string | null;
+  tables: Record<Key, Record<number, Row>>;
+}
+
+/* bumped when cached rows can't be patched in place: v2 drops the partial
+   per-enrollment student rows the server used to send */
+const STORAGE_KEY = 'centro-sync-cache-v2';
+const OLD_STORAGE_KEYS = ['centro-sync-cache'];
+
+const emptyCache = (): Cache => ({
+  token: null,
+  tables: Object.fromEntries(KEYS.map(k => [k, {}])) as Cache['tables'],
+});
+
+function load(): Cache {
+  try {
+    for (const key of OLD_STORAGE_KEYS) localStorage.removeItem(key);
+    const raw = localStorage.getItem(STORAGE_KEY);
+    return raw ? (JSON.parse(raw) as Cache) : emptyCache();
+  } catch {
+    return emptyCache();
+  }
+}
+
+let cache: Cache = load();
+let inflight: Promise<Cache> | null = null;
+
+async function pull(): Promise<Cache> {
+  const params = cache.token ? { since: cache.token } : {};
+  const { data } = await api.get<SyncResponse>('/sync/', { params });
+
+  const next: Cache = data.full ? emptyCache() : cache;
+  for (const key of data.reset ?? []) next.tables[key] = {};
+  for (const key of KEYS) {
+    const table = next.tables[key];
+    for (const row of data[key]) table[row.id] = row;
+    for (const id of data.deleted[key]) delete table[id];
+  }
+  next.token = data.token;
+
+  cache = next;
+  try {
+    localStorage.setItem(STORAGE_KEY, JSON.stringify(cache));
+  } catch {
+    /* storage full / unavailable: keep the in-memory copy */
+  }
+  return cache;
+}
+
+/* concurrent callers share one request */
+export function sync(): Promise<Cache> {
+  inflight ??= pull().finally(() => {
+    inflight = null;
+  });
+  return inflight;
+}
+
+export function resetSyncCache() {
+  cache = emptyCache();
+  localStorage.removeItem(STORAGE_KEY);
+}
+
+export async function syncStudents(): Promise<Student[]> {
+  const { tables } = await sync();
+  return (Object.values(tables.students) as unknown as Student[]).sort((a, b) =>
+    a.last_name.localeCompare(b.last_name),
+  );
+}
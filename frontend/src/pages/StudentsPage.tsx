@@ -13,7 +13,7 @@ import StudentModal from '../components/NewStudentModal';
 import EditStudentModal from '../components/EditStudentModal';
 import type { Student } from '../types/student';
 import MakePaymentModal from '../components/MakePaymentModal';
-import { api } from '../lib/api';
+import { syncStudents } from '../lib/sync';
 
 /* -------------------------------------------------------------------------- */
 
@@ -27,7 +27,7 @@ export default function StudentsPage() {
   /* server data ----------------------------------------------------------- */
   const { data: students = [], isLoading } = useQuery<Student[]>({
     queryKey: ['students'],
-    queryFn: () => api.get('/students/').then(r => r.data),
+    queryFn: syncStudents,
   });
 
   /* UI state -------------------------------------------------------------- */
@@ -14,5 +14,6 @@ export interface Student {
   amount_due: number;
   active: boolean;
   credit_balance: number;
+  household: number | null;
   debt: number;
 };
\ No newline at end of file